@@ -1,19 +1,135 @@
+import itertools
+import random
+import sys
 import librosa
 import numpy as np
-from typing import Dict, List, Tuple
-import music21 as m21
-from scipy.signal import find_peaks
-from sklearn.cluster import KMeans
+from typing import Dict, List, Optional, Tuple
+from numba import njit
+
+_RNG = random.Random()
+
+NOTE_NAMES = ['C', 'C#', 'D', 'D#', 'E', 'F', 'F#', 'G', 'G#', 'A', 'A#', 'B']
+
+# ROTATION_INDEX[i] reordena um vetor de 12 classes de altura transposto em i semitons
+# (equivalente a np.roll(v, i), sem alocar uma cópia por rotação)
+ROTATION_INDEX = (np.arange(12)[None, :] - np.arange(12)[:, None]) % 12
+
+
+@njit(cache=True, fastmath=True)
+def _analyze_segments_numba(chroma, frames_per_segment, hop_frames, sub_window_size,
+                            key_profiles, chord_matrix, note_weights,
+                            silence_threshold, min_chroma_std):
+    """Núcleo numérico da análise segmentada.
+    
+    Retorna, por segmento, o índice e a confiança da tonalidade (-1 para segmentos
+    silenciosos), o índice e a confiança do melhor acorde de cada sub-janela
+    (-1 para janelas silenciosas ou sem conteúdo tonal) e a estabilidade harmônica.
+    """
+    n_chroma = chroma.shape[0]
+    n_frames = chroma.shape[1]
+    if n_frames < frames_per_segment:
+        n_segments = 0
+    else:
+        n_segments = (n_frames - frames_per_segment) // hop_frames + 1
+    
+    sub_hop = sub_window_size // 2
+    n_sub = (frames_per_segment + sub_hop - 1) // sub_hop
+    time_weights = np.linspace(0.8, 1.2, frames_per_segment)
+    
+    key_idx = np.full(n_segments, -1, dtype=np.int64)
+    key_conf = np.zeros(n_segments)
+    chord_idx = np.full((n_segments, n_sub), -1, dtype=np.int64)
+    chord_conf = np.zeros((n_segments, n_sub))
+    stability = np.zeros(n_segments)
+    
+    for s in range(n_segments):
+        start = s * hop_frames
+        
+        # Estabilidade harmônica: 1 - variância temporal média
+        means = np.zeros(n_chroma)
+        var_sum = 0.0
+        for c in range(n_chroma):
+            mean = 0.0
+            for t in range(frames_per_segment):
+                mean += chroma[c, start + t]
+            mean /= frames_per_segment
+            means[c] = mean
+            var = 0.0
+            for t in range(frames_per_segment):
+                diff = chroma[c, start + t] - mean
+                var += diff * diff
+            var_sum += var / frames_per_segment
+        stability[s] = min(1.0, max(0.0, 1.0 - var_sum / n_chroma))
+        
+        # Segmentos silenciosos ou com croma plano não têm tonalidade nem acordes
+        if np.sum(means) < silence_threshold or np.std(means) < min_chroma_std:
+            continue
+        
+        # Tonalidade: perfil médio com pesos temporais, centrado e normalizado
+        profile = np.zeros(n_chroma)
+        for c in range(n_chroma):
+            acc = 0.0
+            for t in range(frames_per_segment):
+                acc += chroma[c, start + t] * time_weights[t]
+            profile[c] = acc / frames_per_segment
+        profile -= profile.mean()
+        norm = np.sqrt(np.sum(profile * profile))
+        if norm > 0:
+            profile /= norm
+        best_score = -np.inf
+        for k in range(key_profiles.shape[0]):
+            score = 0.0
+            for c in range(n_chroma):
+                score += key_profiles[k, c] * profile[c]
+            if score > best_score:
+                best_score = score
+                key_idx[s] = k
+        key_conf[s] = best_score
+        
+        # Acordes: melhor template de cada sub-janela (50% overlap)
+        vec = np.zeros(n_chroma)
+        for w in range(n_sub):
+            ws = start + w * sub_hop
+            we = min(ws + sub_window_size, start + frames_per_segment)
+            for c in range(n_chroma):
+                acc = 0.0
+                for t in range(ws, we):
+                    acc += chroma[c, t]
+                vec[c] = acc / (we - ws)
+            if np.sum(vec) < silence_threshold or np.std(vec) < min_chroma_std:
+                continue
+            vec *= note_weights
+            vec -= vec.mean()
+            norm = np.sqrt(np.sum(vec * vec))
+            if norm > 0:
+                vec /= norm
+            best_score = -np.inf
+            for k in range(chord_matrix.shape[0]):
+                score = 0.0
+                for c in range(n_chroma):
+                    score += chord_matrix[k, c] * vec[c]
+                if score > best_score:
+                    best_score = score
+                    chord_idx[s, w] = k
+            chord_conf[s, w] = best_score
+    
+    return key_idx, key_conf, chord_idx, chord_conf, stability
+
 
 class AudioAnalyzer:
     """Classe para análise avançada de áudio musical."""
     
     def __init__(self):
-        self.note_names = ['C', 'C#', 'D', 'D#', 'E', 'F', 'F#', 'G', 'G#', 'A', 'A#', 'B']
+        self.note_names = NOTE_NAMES
         
         # Perfis de tonalidade Krumhansl-Schmuckler otimizados
-        self.major_profile = np.array([6.35, 2.23, 3.48, 2.33, 4.38, 4.09, 2.52, 5.19, 2.39, 3.66, 2.29, 2.88])
-        self.minor_profile = np.array([6.33, 2.68, 3.52, 5.38, 2.60, 3.53, 2.54, 4.75, 3.98, 2.69, 3.34, 3.17])
+        self.major_profile = np.array([6.35, 2.23, 3.48, 2.33, 4.38, 4.09, 2.52, 5.19, 2.39, 3.66, 2.29, 2.88], dtype=np.float32)
+        self.minor_profile = np.array([6.33, 2.68, 3.52, 5.38, 2.60, 3.53, 2.54, 4.75, 3.98, 2.69, 3.34, 3.17], dtype=np.float32)
+        
+        # Matriz (24, 12) com os perfis das 24 tonalidades já centrados e normalizados,
+        # de modo que a correlação de Pearson se reduz a um produto escalar
+        self.key_names = tuple(sys.intern(f"{n} {mode}") for mode in ('maior', 'menor') for n in self.note_names)
+        self.key_profiles = self._build_key_profiles()
         
         # Templates de acordes expandidos com pesos otimizados
         self.chord_templates = {
@@ -34,27 +150,63 @@ class AudioAnalyzer:
             'maj6': [1.0, 0.0, 0.0, 0.0, 0.8, 0.0, 0.0, 0.9, 0.0, 0.6, 0.0, 0.0]
         }
         
+        # Pesos para cada nota (dá mais importância às fundamentais)
+        self.note_weights = np.array([1.0, 0.7, 0.8, 0.9, 1.0, 0.8, 0.7, 1.0, 0.8, 0.8, 0.7, 0.8], dtype=np.float32)
+        
+        # Matriz (180, 12) com todos os templates (12 raízes x 15 tipos) já ponderados,
+        # centrados e normalizados, na mesma ordem de self.chord_names
+        self.chord_matrix, self.chord_names = self._build_chord_matrix()
+        
+        # Limiares para ignorar janelas silenciosas ou sem conteúdo tonal
+        self.silence_threshold = 1e-6  # Energia mínima do croma médio
+        self.min_chroma_std = 0.01     # Desvio padrão mínimo do croma médio
+        
         # Configurações de análise otimizadas
+        self.sample_rate = 22050
+        self.hop_length = 1024     # ~21.5 frames/s; as janelas abaixo são dadas em frames
         self.segment_length = 3.0  # segundos por segmento
         self.overlap_ratio = 0.5   # 50% de sobreposição entre segmentos
         self.min_chord_confidence = 0.65  # Confiança mínima para detecção de acordes
         self.key_change_threshold = 0.15   # Limiar para detectar mudanças de tonalidade
+        
+        # Frequência mínima do CQT (C2), calculada uma única vez
+        self.fmin_c2 = librosa.note_to_hz('C2')
+        
+        # Análise simplificada de progressões comuns
+        self.common_progressions = {
+            ('C', 'F'): 'I-IV',
+            ('C', 'G'): 'I-V',
+            ('Am', 'F'): 'vi-IV',
+            ('F', 'G'): 'IV-V',
+            ('G', 'C'): 'V-I',
+            ('Am', 'C'): 'vi-I'
+        }
+        self.progression_roots = {chord: self.progression_root(chord) for chord in self.chord_names}
+        
+        # Cache dos pesos temporais por número de frames
+        self._time_weights_cache = {}
     
     def analyze_audio_file(self, file_path: str) -> Dict:
         """Analisa um arquivo de áudio com algoritmos otimizados."""
         try:
             # Carrega o áudio com parâmetros otimizados
-            y, sr = librosa.load(file_path, sr=22050)
-            
+            y, sr = librosa.load(file_path, sr=self.sample_rate, res_type='soxr_hq')
+            return self.analyze_signal(y, sr)
+        except Exception as e:
+            return {'erro': str(e)}
+    
+    def analyze_signal(self, y: np.ndarray, sr: int) -> Dict:
+        """Analisa um sinal de áudio já carregado (mono, na taxa sr)."""
+        try:
             # Análise básica
             duration = len(y) / sr
             tempo, beats = librosa.beat.beat_track(y=y, sr=sr, units='time')
             
             # Análise de croma com parâmetros otimizados
-            hop_length = 512
+            hop_length = self.hop_length
             chroma = librosa.feature.chroma_cqt(y=y, sr=sr, hop_length=hop_length, 
-                                               fmin=librosa.note_to_hz('C2'),
-                                               n_chroma=12, norm=2)
+                                               fmin=self.fmin_c2,
+                                               n_chroma=12, norm=2).astype(np.float32, copy=False)
             
             # Suavização do croma para reduzir ruído
             chroma = self.smooth_chroma(chroma)
@@ -77,7 +229,7 @@ class AudioAnalyzer:
             return {
                 'tonalidade_global': global_key,
                 'confianca_tonalidade': key_confidence,
-                'tempo': float(tempo),
+                'tempo': float(np.atleast_1d(tempo)[0]),  # librosa recente devolve o tempo como array de 1 elemento
                 'duracao': duration,
                 'acordes_globais_detectados': global_chords,
                 'analise_segmentada': segmented_analysis,
@@ -91,202 +243,215 @@ class AudioAnalyzer:
     
     def smooth_chroma(self, chroma: np.ndarray, window_size: int = 5) -> np.ndarray:
         """Aplica suavização temporal ao croma para reduzir ruído."""
-        from scipy.ndimage import uniform_filter1d
-        return uniform_filter1d(chroma, size=window_size, axis=1)
+        # Média móvel centrada via soma acumulada (bordas refletidas, como no uniform_filter1d)
+        left = window_size // 2
+        right = window_size - 1 - left
+        padded = np.pad(chroma, ((0, 0), (left, right)), mode='symmetric')
+        cumsum = np.cumsum(padded, axis=1, dtype=np.float64)  # acumula em float64 para evitar deriva
+        cumsum = np.concatenate([np.zeros((chroma.shape[0], 1)), cumsum], axis=1)
+        smoothed = (cumsum[:, window_size:] - cumsum[:, :-window_size]) / window_size
+        return smoothed.astype(chroma.dtype, copy=False)
     
-    def detect_key_krumhansl_schmuckler_enhanced(self, chroma: np.ndarray) -> Tuple[str, float]:
+    def detect_key_krumhansl_schmuckler_enhanced(self, chroma: np.ndarray) -> Tuple[Optional[str], float]:
         """Detecta tonalidade com algoritmo Krumhansl-Schmuckler melhorado."""
         # Calcula o perfil de croma médio com pesos temporais
-        weights = np.linspace(0.8, 1.2, chroma.shape[1])  # Dá mais peso ao final
-        chroma_weighted = chroma * weights
-        chroma_mean = np.mean(chroma_weighted, axis=1)
-        
-        # Normaliza o perfil
-        if np.sum(chroma_mean) > 0:
-            chroma_mean = chroma_mean / np.sum(chroma_mean)
-        
-        correlations = []
-        
-        # Testa todas as 24 tonalidades
-        for i in range(12):
-            # Tonalidade maior
-            major_template = np.roll(self.major_profile, i)
-            major_template = major_template / np.sum(major_template)
-            major_corr = np.corrcoef(chroma_mean, major_template)[0, 1]
-            if not np.isnan(major_corr):
-                correlations.append((major_corr, f"{self.note_names[i]} maior"))
-            
-            # Tonalidade menor
-            minor_template = np.roll(self.minor_profile, i)
-            minor_template = minor_template / np.sum(minor_template)
-            minor_corr = np.corrcoef(chroma_mean, minor_template)[0, 1]
-            if not np.isnan(minor_corr):
-                correlations.append((minor_corr, f"{self.note_names[i]} menor"))
-        
-        # Retorna a tonalidade com maior correlação
-        correlations.sort(reverse=True)
-        best_correlation, best_key = correlations[0]
-        
-        return best_key, float(best_correlation)
+        weights = self.get_time_weights(chroma.shape[1])  # Dá mais peso ao final
+        chroma_mean = np.asarray(chroma, dtype=np.float32) @ weights / chroma.shape[1]
+        
+        # Áudio silencioso não tem tonalidade definida. Só a energia é testada: num áudio longo e
+        # harmonicamente variado o croma médio fica naturalmente plano, e o limiar absoluto de
+        # desvio padrão (pensado para janelas curtas) descartaria a tonalidade global
+        if np.sum(chroma_mean) < self.silence_threshold:
+            return None, 0.0
+        
+        # Centraliza e normaliza o perfil (correlação de Pearson via produto escalar)
+        chroma_mean = chroma_mean - np.mean(chroma_mean)
+        norm = np.linalg.norm(chroma_mean)
+        if norm > 0:
+            chroma_mean = chroma_mean / norm
+        
+        # Testa todas as 24 tonalidades com um único produto matriz-vetor
+        correlations = self.key_profiles @ chroma_mean
+        best_idx = int(np.argmax(correlations))
+        
+        return self.key_names[best_idx], float(correlations[best_idx])
+    
+    def get_time_weights(self, n_frames: int) -> np.ndarray:
+        """Retorna (com cache por tamanho) os pesos temporais lineares de 0.8 a 1.2."""
+        weights = self._time_weights_cache.get(n_frames)
+        if weights is None:
+            weights = np.linspace(0.8, 1.2, n_frames, dtype=np.float32)
+            self._time_weights_cache[n_frames] = weights
+        return weights
+    
+    def _build_key_profiles(self) -> np.ndarray:
+        """Monta a matriz (24, 12) de perfis de tonalidade centrados e normalizados."""
+        # Todas as 12 rotações de cada perfil com um único gather indexado
+        profiles = np.concatenate([self.major_profile[ROTATION_INDEX], self.minor_profile[ROTATION_INDEX]])
+        profiles = profiles - profiles.mean(axis=1, keepdims=True)
+        profiles = profiles / np.linalg.norm(profiles, axis=1, keepdims=True)
+        return profiles.astype(np.float32)
+    
+    def warmup_kernels(self) -> None:
+        """Compila só o núcleo Numba da análise segmentada, com um cromagrama sintético de dois segmentos."""
+        frames = 2 * int(self.segment_length * self.sample_rate / self.hop_length)
+        chroma = np.zeros((12, frames), dtype=np.float32)
+        chroma[[0, 4, 7], :] = 1.0
+        self.analyze_segments_optimized(chroma, self.sample_rate, self.hop_length,
+                                        frames * self.hop_length / self.sample_rate)
+    
+    def warmup(self) -> None:
+        """Analisa um acorde sintético para compilar o núcleo Numba e as funções JIT do librosa antes do primeiro pedido."""
+        # Dois segmentos de um acorde de Dó maior tocado a 120 bpm (com ataques, para o rastreador
+        # de batidas encontrar batidas), o bastante para passar por todas as etapas
+        t = np.arange(int(2 * self.segment_length * self.sample_rate), dtype=np.float32) / self.sample_rate
+        envelope = np.exp(-5 * ((2 * t) % 1))
+        y = (envelope * sum(np.sin(2 * np.pi * f * t) for f in (261.63, 329.63, 392.0)) / 3).astype(np.float32)
+        self.analyze_signal(y, self.sample_rate)
     
     def analyze_segments_optimized(self, chroma: np.ndarray, sr: int, hop_length: int, duration: float) -> Tuple[List[Dict], List[Dict]]:
         """Análise segmentada otimizada com sobreposição."""
         frames_per_segment = int(self.segment_length * sr / hop_length)
         hop_frames = int(frames_per_segment * (1 - self.overlap_ratio))
         
+        # Análise de acordes em sub-janelas dentro do segmento
+        sub_window_size = 11  # ~0.5 segundos
+        
+        # Todo o trabalho numérico dos segmentos é feito no núcleo compilado
+        key_idx, key_conf, chord_idx, chord_conf, stability = _analyze_segments_numba(
+            np.ascontiguousarray(chroma, dtype=np.float32), frames_per_segment, hop_frames,
+            sub_window_size, self.key_profiles, self.chord_matrix, self.note_weights,
+            self.silence_threshold, self.min_chroma_std)
+        
         segmented_analysis = []
         key_changes = []
         previous_key = None
         previous_confidence = 0
         
-        for i in range(0, chroma.shape[1] - frames_per_segment + 1, hop_frames):
+        for s in range(len(key_idx)):
+            i = s * hop_frames
             start_time = i * hop_length / sr
             end_time = min((i + frames_per_segment) * hop_length / sr, duration)
             
-            # Extrai segmento de croma
-            segment_chroma = chroma[:, i:i+frames_per_segment]
+            # Segmentos silenciosos não têm tonalidade e não entram na detecção de mudanças
+            silent = key_idx[s] < 0
+            segment_key = None if silent else self.key_names[key_idx[s]]
+            key_confidence = float(key_conf[s])
             
-            if segment_chroma.shape[1] > 0:
-                # Detecção de tonalidade do segmento
-                segment_key, key_confidence = self.detect_key_krumhansl_schmuckler_enhanced(segment_chroma)
-                
-                # Detecção de acordes do segmento
-                segment_chords = self.detect_chords_in_segment_enhanced(segment_chroma)
-                
-                # Análise de estabilidade harmônica
-                harmonic_stability = self.calculate_harmonic_stability(segment_chroma)
-                
-                segmented_analysis.append({
-                    'start_time': start_time,
-                    'end_time': end_time,
-                    'tonalidade_segmento': segment_key,
-                    'confianca_tonalidade': key_confidence,
-                    'acordes_segmento': segment_chords,
-                    'estabilidade_harmonica': harmonic_stability
+            # Acumula a confiança por acorde nas sub-janelas confiáveis
+            mask = (chord_idx[s] >= 0) & (chord_conf[s] > self.min_chord_confidence)
+            totals = np.bincount(chord_idx[s][mask], weights=chord_conf[s][mask],
+                                 minlength=len(self.chord_names))
+            segment_chords = self.top_chords(totals, 4)
+            
+            segmented_analysis.append({
+                'start_time': start_time,
+                'end_time': end_time,
+                'tonalidade_segmento': segment_key,
+                'confianca_tonalidade': key_confidence,
+                'acordes_segmento': segment_chords,
+                'estabilidade_harmonica': float(stability[s])
+            })
+            
+            if silent:
+                continue
+            
+            # Detecta mudanças de tonalidade significativas
+            if (previous_key and previous_key != segment_key and 
+                abs(key_confidence - previous_confidence) > self.key_change_threshold):
+                key_changes.append({
+                    'time': start_time,
+                    'from_key': previous_key,
+                    'to_key': segment_key,
+                    'confidence_change': abs(key_confidence - previous_confidence)
                 })
-                
-                # Detecta mudanças de tonalidade significativas
-                if (previous_key and previous_key != segment_key and 
-                    abs(key_confidence - previous_confidence) > self.key_change_threshold):
-                    key_changes.append({
-                        'time': start_time,
-                        'from_key': previous_key,
-                        'to_key': segment_key,
-                        'confidence_change': abs(key_confidence - previous_confidence)
-                    })
-                
-                previous_key = segment_key
-                previous_confidence = key_confidence
+            
+            previous_key = segment_key
+            previous_confidence = key_confidence
         
         return segmented_analysis, key_changes
     
     def detect_chords_global_enhanced(self, chroma: np.ndarray) -> List[str]:
         """Detecta acordes predominantes com algoritmo melhorado."""
-        detected_chords = {}
-        
         # Analisa janelas menores para maior precisão
         window_size = 22  # ~1 segundo
         
-        for i in range(0, chroma.shape[1], window_size // 2):  # 50% overlap
-            window_chroma = chroma[:, i:i+window_size]
-            if window_chroma.shape[1] > 0:
-                chord, confidence = self.detect_chord_in_window_enhanced(np.mean(window_chroma, axis=1))
-                if chord and confidence > self.min_chord_confidence:
-                    if chord in detected_chords:
-                        detected_chords[chord] += confidence
-                    else:
-                        detected_chords[chord] = confidence
-        
         # Ordena por confiança e retorna os mais prováveis
-        sorted_chords = sorted(detected_chords.items(), key=lambda x: x[1], reverse=True)
-        return [chord for chord, _ in sorted_chords[:8]]
-    
-    def detect_chords_in_segment_enhanced(self, segment_chroma: np.ndarray) -> List[str]:
-        """Detecta acordes em um segmento com maior precisão."""
-        detected_chords = {}
-        
-        # Analisa sub-janelas dentro do segmento
-        sub_window_size = 11  # ~0.5 segundos
-        
-        for i in range(0, segment_chroma.shape[1], sub_window_size // 2):
-            window_chroma = segment_chroma[:, i:i+sub_window_size]
-            if window_chroma.shape[1] > 0:
-                chord, confidence = self.detect_chord_in_window_enhanced(np.mean(window_chroma, axis=1))
-                if chord and confidence > self.min_chord_confidence:
-                    if chord in detected_chords:
-                        detected_chords[chord] += confidence
-                    else:
-                        detected_chords[chord] = confidence
-        
-        # Retorna acordes ordenados por confiança
-        sorted_chords = sorted(detected_chords.items(), key=lambda x: x[1], reverse=True)
-        return [chord for chord, _ in sorted_chords[:4]]
+        return self.detect_chords_in_windows(chroma, window_size, top_k=8)
     
-    def detect_chord_in_window_enhanced(self, chroma_vector: np.ndarray) -> Tuple[str, float]:
-        """Detecta acorde com maior precisão e retorna confiança."""
-        # Normaliza o vetor de croma
-        if np.sum(chroma_vector) > 0:
-            chroma_vector = chroma_vector / np.sum(chroma_vector)
-        else:
-            return None, 0.0
-        
-        best_match = None
-        best_score = -1
-        
-        # Testa todos os acordes em todas as transposições
-        for root in range(12):
-            for chord_type, template in self.chord_templates.items():
-                # Transpõe o template para a raiz atual
-                transposed_template = np.roll(template, root)
-                transposed_template = np.array(transposed_template, dtype=float)
-                
-                # Normaliza o template
-                if np.sum(transposed_template) > 0:
-                    transposed_template = transposed_template / np.sum(transposed_template)
-                
-                # Calcula correlação ponderada
-                correlation = self.calculate_weighted_correlation(chroma_vector, transposed_template)
-                
-                if not np.isnan(correlation) and correlation > best_score:
-                    best_score = correlation
-                    chord_name = f"{self.note_names[root]}{chord_type if chord_type != 'major' else ''}"
-                    best_match = chord_name
+    def detect_chords_in_windows(self, chroma: np.ndarray, window_size: int, top_k: int) -> List[str]:
+        """Detecta acordes em todas as janelas (50% overlap) com um único produto matricial."""
+        n_frames = chroma.shape[1]
+        if n_frames == 0:
+            return []
         
-        return best_match, float(best_score) if best_match else (None, 0.0)
+        # Croma médio de cada janela via soma acumulada (janelas finais podem ser menores)
+        starts = np.arange(0, n_frames, window_size // 2)
+        ends = np.minimum(starts + window_size, n_frames)
+        cumsum = np.concatenate([np.zeros((chroma.shape[0], 1)), np.cumsum(chroma, axis=1, dtype=np.float64)], axis=1)
+        windows = ((cumsum[:, ends] - cumsum[:, starts]) / (ends - starts)).T
+        
+        # Pondera, centraliza e normaliza todas as janelas de uma vez
+        has_energy = ((windows.sum(axis=1) >= self.silence_threshold) &
+                      (windows.std(axis=1) >= self.min_chroma_std))
+        windows = windows * self.note_weights
+        windows = windows - windows.mean(axis=1, keepdims=True)
+        norms = np.linalg.norm(windows, axis=1, keepdims=True)
+        windows = np.divide(windows, norms, out=np.zeros_like(windows), where=norms > 0)
+        
+        scores = windows.astype(np.float32) @ self.chord_matrix.T
+        best = np.argmax(scores, axis=1)
+        confidence = scores[np.arange(len(best)), best]
+        
+        # Acumula a confiança por acorde nas janelas confiáveis
+        mask = has_energy & (confidence > self.min_chord_confidence)
+        totals = np.bincount(best[mask], weights=confidence[mask], minlength=len(self.chord_names))
+        
+        return self.top_chords(totals, top_k)
     
-    def calculate_weighted_correlation(self, chroma1: np.ndarray, chroma2: np.ndarray) -> float:
-        """Calcula correlação ponderada dando mais peso às notas fundamentais."""
-        # Pesos para cada nota (dá mais importância às fundamentais)
-        weights = np.array([1.0, 0.7, 0.8, 0.9, 1.0, 0.8, 0.7, 1.0, 0.8, 0.8, 0.7, 0.8])
-        
-        weighted_chroma1 = chroma1 * weights
-        weighted_chroma2 = chroma2 * weights
-        
-        correlation = np.corrcoef(weighted_chroma1, weighted_chroma2)[0, 1]
-        return correlation if not np.isnan(correlation) else 0.0
+    def top_chords(self, totals: np.ndarray, top_k: int) -> List[str]:
+        """Retorna os top_k acordes com maior confiança acumulada (ignorando os ausentes)."""
+        candidates = np.flatnonzero(totals > 0)
+        if len(candidates) > top_k:
+            # Seleção O(n): mantém só quem empata ou supera o k-ésimo maior valor
+            threshold = -np.partition(-totals[candidates], top_k - 1)[top_k - 1]
+            candidates = candidates[totals[candidates] >= threshold]
+        
+        # Ordena por confiança decrescente, desempatando pela ordem dos templates
+        ranked = candidates[np.lexsort((candidates, -totals[candidates]))][:top_k]
+        return [self.chord_names[idx] for idx in ranked]
     
-    def calculate_harmonic_stability(self, chroma: np.ndarray) -> float:
-        """Calcula a estabilidade harmônica de um segmento."""
-        # Calcula a variância temporal do croma
-        chroma_var = np.var(chroma, axis=1)
-        stability = 1.0 - np.mean(chroma_var)
-        return max(0.0, min(1.0, stability))
+    def _build_chord_matrix(self) -> Tuple[np.ndarray, Tuple[str, ...]]:
+        """Monta a matriz (180, 12) de templates de acordes ponderados e normalizados."""
+        # (tipos, raízes, notas) via gather indexado, reordenado para (raiz, tipo) em cada linha
+        templates = np.array(list(self.chord_templates.values()), dtype=np.float32)
+        matrix = templates[:, ROTATION_INDEX].transpose(1, 0, 2).reshape(-1, 12) * self.note_weights
+        names = [sys.intern(f"{self.note_names[root]}{chord_type if chord_type != 'major' else ''}")
+                 for root in range(12) for chord_type in self.chord_templates]
+        
+        matrix = matrix - matrix.mean(axis=1, keepdims=True)
+        matrix = matrix / np.linalg.norm(matrix, axis=1, keepdims=True)
+        return matrix.astype(np.float32), tuple(names)
     
     def analyze_musical_structure(self, chroma: np.ndarray, beats: np.ndarray) -> Dict:
         """Analisa a estrutura musical (verso, refrão, etc.)."""
         try:
             # Usa clustering para identificar seções similares
             segment_size = 44  # ~2 segundos
-            segments = []
+            half_size = segment_size // 2
+            n_segments = max(0, -(-(chroma.shape[1] - segment_size) // half_size))
             
-            for i in range(0, chroma.shape[1] - segment_size, segment_size // 2):
-                segment = chroma[:, i:i+segment_size]
-                segments.append(np.mean(segment, axis=1))
+            # Médias de meios-segmentos via reshape; cada segmento (50% overlap)
+            # é a média de dois meios-segmentos consecutivos
+            n_halves = n_segments + 1 if n_segments else 0
+            halves = chroma[:, :n_halves * half_size].reshape(chroma.shape[0], n_halves, half_size).mean(axis=2).T
+            segments = (halves[:-1] + halves[1:]) / 2
             
             if len(segments) > 3:
-                # Aplica K-means para identificar seções
+                # Aplica K-means (mini-batch) para identificar seções
+                from sklearn.cluster import MiniBatchKMeans
                 n_clusters = min(4, len(segments) // 2)
-                kmeans = KMeans(n_clusters=n_clusters, random_state=42, n_init=10)
+                kmeans = MiniBatchKMeans(n_clusters=n_clusters, random_state=42, n_init=3, batch_size=256)
                 labels = kmeans.fit_predict(segments)
                 
                 # Mapeia clusters para seções musicais
@@ -294,7 +459,7 @@ class AudioAnalyzer:
                 sections = []
                 
                 for i, label in enumerate(labels):
-                    start_time = i * segment_size * 512 / 22050 / 2  # Conversão para segundos
+                    start_time = i * half_size * self.hop_length / self.sample_rate  # Conversão para segundos
                     sections.append({
                         'section': section_names[label % len(section_names)],
                         'start_time': start_time,
@@ -339,27 +504,59 @@ class AudioAnalyzer:
     
     def classify_progression(self, chords1: List[str], chords2: List[str]) -> str:
         """Classifica o tipo de progressão harmônica."""
-        # Análise simplificada de progressões comuns
-        common_progressions = {
-            ('C', 'F'): 'I-IV',
-            ('C', 'G'): 'I-V',
-            ('Am', 'F'): 'vi-IV',
-            ('F', 'G'): 'IV-V',
-            ('G', 'C'): 'V-I',
-            ('Am', 'C'): 'vi-I'
-        }
+        # Raízes pré-calculadas para os acordes conhecidos (sem split por chamada)
+        roots1 = [self.progression_roots.get(chord) or self.progression_root(chord) for chord in chords1]
+        roots2 = [self.progression_roots.get(chord) or self.progression_root(chord) for chord in chords2]
         
-        # Verifica se há progressões conhecidas
-        for chord1 in chords1:
-            for chord2 in chords2:
-                # Remove sufixos para comparação básica
-                root1 = chord1.split('m')[0].split('7')[0].split('dim')[0]
-                root2 = chord2.split('m')[0].split('7')[0].split('dim')[0]
-                
-                if (root1, root2) in common_progressions:
-                    return common_progressions[(root1, root2)]
+        # Verifica se há progressões conhecidas (para na primeira encontrada)
+        for pair in itertools.product(roots1, roots2):
+            progression = self.common_progressions.get(pair)
+            if progression is not None:
+                return progression
         
         return 'Progressão personalizada'
+    
+    @staticmethod
+    def progression_root(chord: str) -> str:
+        """Remove sufixos do acorde para comparação básica de progressões."""
+        return chord.split('m')[0].split('7')[0].split('dim')[0]
+
+# Campos harmônicos usados por generate_basic_chord_progression:
+# (intervalos dos graus, qualidade das tríades, progressões possíveis em graus)
+BASIC_PROGRESSION_FIELDS = {
+    # Campo harmônico maior: I - ii - iii - IV - V - vi - vii°
+    "maior": (
+        (0, 2, 4, 5, 7, 9, 11),
+        ("", "m", "m", "", "", "m", "dim"),
+        (
+            (0, 3, 4, 0),  # I - IV - V - I
+            (0, 5, 3, 4),  # I - vi - IV - V
+            (5, 3, 0, 4),  # vi - IV - I - V
+            (0, 1, 3, 4)   # I - ii - IV - V
+        )
+    ),
+    # Campo harmônico menor: i - ii° - III - iv - v - VI - VII
+    "menor": (
+        (0, 2, 3, 5, 7, 8, 10),
+        ("m", "dim", "", "m", "m", "", ""),
+        (
+            (0, 3, 4, 0),  # i - iv - v - i
+            (0, 5, 6, 0),  # i - VI - VII - i
+            (0, 2, 5, 6),  # i - III - VI - VII
+            (0, 3, 5, 4)   # i - iv - VI - v
+        )
+    )
+}
+
+# Progressões já cifradas para cada (tônica, modo): a chamada só sorteia uma delas
+BASIC_PROGRESSIONS = {
+    (tonic, mode): tuple(
+        tuple(f"{NOTE_NAMES[(root_idx + intervals[degree]) % 12]}{qualities[degree]}" for degree in degrees)
+        for degrees in options
+    )
+    for root_idx, tonic in enumerate(NOTE_NAMES)
+    for mode, (intervals, qualities, options) in BASIC_PROGRESSION_FIELDS.items()
+}
 
 def generate_basic_chord_progression(key: str) -> List[str]:
     """Gera uma progressão de acordes básica baseada na tonalidade."""
@@ -368,50 +565,16 @@ def generate_basic_chord_progression(key: str) -> List[str]:
         parts = key.split()
         if len(parts) >= 2:
             tonic = parts[0]
-            mode = parts[1].lower()
+            mode = "maior" if parts[1].lower() == "maior" else "menor"
         else:
             return []
         
-        note_names = ['C', 'C#', 'D', 'D#', 'E', 'F', 'F#', 'G', 'G#', 'A', 'A#', 'B']
-        
-        if tonic not in note_names:
+        options = BASIC_PROGRESSIONS.get((tonic, mode))
+        if options is None:
             return []
         
-        root_idx = note_names.index(tonic)
-        
-        if mode == "maior":
-            # Campo harmônico maior: I - ii - iii - IV - V - vi - vii°
-            intervals = [0, 2, 4, 5, 7, 9, 11]
-            qualities = ["", "m", "m", "", "", "m", "dim"]
-            # Progressões mais variadas
-            progression_options = [
-                [0, 3, 4, 0],  # I - IV - V - I
-                [0, 5, 3, 4],  # I - vi - IV - V
-                [5, 3, 0, 4],  # vi - IV - I - V
-                [0, 1, 3, 4]   # I - ii - IV - V
-            ]
-        else:  # menor
-            # Campo harmônico menor: i - ii° - III - iv - v - VI - VII
-            intervals = [0, 2, 3, 5, 7, 8, 10]
-            qualities = ["m", "dim", "", "m", "m", "", ""]
-            progression_options = [
-                [0, 3, 4, 0],  # i - iv - v - i
-                [0, 5, 6, 0],  # i - VI - VII - i
-                [0, 2, 5, 6],  # i - III - VI - VII
-                [0, 3, 5, 4]   # i - iv - VI - v
-            ]
-        
         # Escolhe uma progressão aleatoriamente
-        import random
-        progression_degrees = random.choice(progression_options)
-        
-        progression = []
-        for degree in progression_degrees:
-            chord_root = note_names[(root_idx + intervals[degree]) % 12]
-            chord_quality = qualities[degree]
-            progression.append(f"{chord_root}{chord_quality}")
-        
-        return progression
+        return list(_RNG.choice(options))
         
     except Exception:
         return []
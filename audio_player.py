@@ -1,4 +1,3 @@
-
 """Audio playback & synthesis utilities for FastAPI backends.
 
 This module provides:
@@ -23,34 +22,131 @@ Folder conventions:
 
 from __future__ import annotations
 
-import io
 import math
 import os
-import wave
 import struct
+from functools import lru_cache
 from pathlib import Path
-from typing import Generator, Iterable, List, Optional, Tuple
+from typing import Generator, List, Optional, Tuple
+
+import numpy as np
 
 try:
     # Optional: Only imported if FastAPI is available
     from fastapi import APIRouter, HTTPException, Query, Request
-    from fastapi.responses import Response, StreamingResponse, JSONResponse
+    from fastapi.responses import FileResponse, Response, StreamingResponse, JSONResponse
 except Exception:  # pragma: no cover - allows using the class without FastAPI installed
     APIRouter = None  # type: ignore
     HTTPException = Exception  # type: ignore
     Request = object  # type: ignore
     Response = object  # type: ignore
     StreamingResponse = object  # type: ignore
+    FileResponse = object  # type: ignore
     JSONResponse = object  # type: ignore
 
+try:
+    # Optional: fused synthesis kernel, compiled only if Numba is available
+    from numba import njit
+except Exception:  # pragma: no cover - falls back to the NumPy synthesis path
+    njit = None
+
 __all__ = ["AudioPlayer", "router"]
 
+# ---------------------------
+# Waveform kernels
+# ---------------------------
+
+# Each kernel maps sample indices `n` to samples in [-1, 1] for a tone at `freq` Hz.
+
+# 4096-entry sine table indexed by the top 12 bits of a 32-bit phase accumulator. The NumPy and
+# Numba kernels share the table and the accumulator, so both paths render the same sine and square
+_SINE_LUT_BITS = 12
+_SINE_LUT = np.sin(2.0 * np.pi * np.arange(1 << _SINE_LUT_BITS) / (1 << _SINE_LUT_BITS)).astype(np.float32)
+
+def _phase(n: np.ndarray, freq: float, sample_rate: int) -> np.ndarray:
+    phase_inc = int(freq * 4294967296.0 / sample_rate + 0.5) & 0xFFFFFFFF
+    return (n.astype(np.int64) * phase_inc) & 0xFFFFFFFF
+
+def _sine(n: np.ndarray, freq: float, sample_rate: int) -> np.ndarray:
+    return _SINE_LUT[_phase(n, freq, sample_rate) >> (32 - _SINE_LUT_BITS)]
+
+def _square(n: np.ndarray, freq: float, sample_rate: int) -> np.ndarray:
+    return np.where(_phase(n, freq, sample_rate) < 0x80000000, 1.0, -1.0)
+
+def _triangle(n: np.ndarray, freq: float, sample_rate: int) -> np.ndarray:
+    # Triangle via arc-sin(sin) approximation (exact sine: the table's steps would show in the ramps)
+    return 2.0 / math.pi * np.arcsin(np.sin((2.0 * math.pi * freq / sample_rate) * n))
+
+def _saw(n: np.ndarray, freq: float, sample_rate: int) -> np.ndarray:
+    t = (n / sample_rate) * freq
+    return 2.0 * (t - np.floor(0.5 + t))
+
+_WAVEFORMS = {"sine": _sine, "square": _square, "triangle": _triangle, "saw": _saw}
+_WAVEFORM_IDS = {"sine": 0, "square": 1, "triangle": 2, "saw": 3}
+
+if njit is not None:
+
+    @njit(cache=True, fastmath=True)
+    def _render_tone(freq, sample_rate, num_samples, attack_samples, release_samples, volume, waveform_id, out, start=0):
+        """Render samples [start, start + len(out)) of a tone straight into `out` (int16).
+
+        Waveform, ADSR, volume and quantization are fused; `start` lets callers render in chunks.
+        The oscillator is a wrapping 32-bit integer phase accumulator, so chunks join exactly.
+        """
+        phase_inc = np.int64(freq * 4294967296.0 / sample_rate + 0.5) & 0xFFFFFFFF
+        phase = (np.int64(start) * phase_inc) & 0xFFFFFFFF
+        lut_shift = 32 - _SINE_LUT_BITS
+        release_start = num_samples - release_samples
+        for i in range(out.shape[0]):
+            n = start + i
+            cycle = phase * (1.0 / 4294967296.0)  # position inside the current period, in [0, 1)
+            if waveform_id == 0:
+                s = _SINE_LUT[phase >> lut_shift]
+            elif waveform_id == 1:
+                s = 1.0 if phase < 0x80000000 else -1.0
+            elif waveform_id == 2:
+                # Piecewise-linear triangle, identical to arc-sin(sin) without transcendentals
+                if cycle < 0.25:
+                    s = 4.0 * cycle
+                elif cycle < 0.75:
+                    s = 2.0 - 4.0 * cycle
+                else:
+                    s = 4.0 * cycle - 4.0
+            else:
+                s = 2.0 * cycle if cycle < 0.5 else 2.0 * (cycle - 1.0)
+
+            if n < attack_samples:
+                s *= (n + 1) / attack_samples
+            if n >= release_start:
+                s *= 1.0 - (n - release_start + 1) / release_samples
+
+            s = max(-1.0, min(1.0, s)) * volume
+            out[i] = int(s * 32767.0)
+
+            phase = (phase + phase_inc) & 0xFFFFFFFF
+else:  # pragma: no cover - Numba not installed, synthesize_tone uses the NumPy path
+    _render_tone = None
+
 # ---------------------------
 # Core synthesis engine
 # ---------------------------
 
+def _equal_tempered_freq(a4_freq: float, semitone_index: int, octave: int) -> float:
+    # MIDI number approach: A4 (MIDI 69) = 440 Hz
+    midi_num = (octave + 1) * 12 + semitone_index  # MIDI standard: C-1 = 0
+    n = midi_num - 69  # distance from A4
+    return float(a4_freq * (2.0 ** (n / 12.0)))
+
+def _build_freq_table(note_order: List[str], a4_freq: float) -> dict:
+    """(note, octave) -> Hz for every note in octaves 0..8 (the range the /note endpoint accepts)."""
+    return {
+        (name, octave): _equal_tempered_freq(a4_freq, i, octave)
+        for octave in range(9)
+        for i, name in enumerate(note_order)
+    }
+
 class AudioPlayer:
-    """Tiny audio synthesis helper (no external deps).
+    """Tiny audio synthesis helper (NumPy, with an optional Numba kernel).
 
     Generates mono 16-bit PCM WAV bytes for single tones/notes with a simple ADSR.
     Designed to be called from FastAPI endpoints or other Python code.
@@ -60,6 +156,7 @@ class AudioPlayer:
     SAMPLE_RATE = 44100
     NOTE_ORDER = ["C", "C#", "D", "D#", "E", "F", "F#", "G", "G#", "A", "A#", "B"]
     ALT_NAMES = {"DB": "C#", "EB": "D#", "GB": "F#", "AB": "G#", "BB": "A#"}
+    _FREQ_TABLE = _build_freq_table(NOTE_ORDER, A4_FREQ)
 
     def __init__(
         self,
@@ -97,49 +194,18 @@ class AudioPlayer:
             raise ValueError("duration must be > 0")
 
         volume = self._clamp(volume if volume is not None else self.default_volume, 0.0, 1.0)
-        num_samples = int(self.sample_rate * duration)
-        attack_samples = int(self.sample_rate * max(0.0, attack))
-        release_samples = int(self.sample_rate * max(0.0, release))
-        sustain_samples = max(0, num_samples - attack_samples - release_samples)
-
-        # Generate raw floating samples in range [-1, 1]
-        twopi_f_div_sr = 2.0 * math.pi * freq / self.sample_rate
-        samples: List[float] = []
-
-        if waveform == "sine":
-            for n in range(num_samples):
-                samples.append(math.sin(twopi_f_div_sr * n))
-        elif waveform == "square":
-            for n in range(num_samples):
-                samples.append(1.0 if math.sin(twopi_f_div_sr * n) >= 0.0 else -1.0)
-        elif waveform == "triangle":
-            # Triangle via arc-sin(sin) approximation
-            for n in range(num_samples):
-                samples.append(2.0 / math.pi * math.asin(math.sin(twopi_f_div_sr * n)))
-        elif waveform == "saw":
-            for n in range(num_samples):
-                t = (n / self.sample_rate) * freq
-                samples.append(2.0 * (t - math.floor(0.5 + t)))
-        else:
+        if waveform not in _WAVEFORMS:
             raise ValueError("Unsupported waveform. Use 'sine' | 'square' | 'triangle' | 'saw'.")
 
-        # Apply simple ADSR (attack-sustain-release)
-        if attack_samples:
-            for i in range(attack_samples):
-                samples[i] *= (i + 1) / attack_samples
-        if release_samples:
-            for i in range(release_samples):
-                idx = num_samples - release_samples + i
-                if 0 <= idx < num_samples:
-                    samples[idx] *= (1.0 - (i + 1) / release_samples)
-
-        # No fancy sustain shaping; keep middle flat
-        # Scale by volume and convert to 16-bit PCM
-        pcm_bytes = self._float_to_pcm16(samples, volume)
-
-        # Wrap as WAV
-        wav_data = self._pcm_to_wav(pcm_bytes, self.sample_rate, num_channels=1, sampwidth=2)
-        return wav_data
+        return _synthesize_wav(
+            float(freq),
+            float(duration),
+            volume,
+            waveform,
+            float(attack),
+            float(release),
+            self.sample_rate,
+        )
 
     def synthesize_note(
         self,
@@ -163,8 +229,117 @@ class AudioPlayer:
             release=release,
         )
 
+    def stream_tone(
+        self,
+        freq: float,
+        duration: float = 1.0,
+        *,
+        volume: Optional[float] = None,
+        waveform: str = "sine",
+        attack: float = 0.01,
+        release: float = 0.05,
+        chunk_samples: int = 16384,
+    ) -> Generator[bytes, None, None]:
+        """Like `synthesize_tone`, but yield the WAV header and then PCM in chunks as it is rendered.
+
+        Arguments are validated eagerly, so errors surface before the first chunk is sent.
+        """
+        if not (freq > 0):
+            raise ValueError("freq must be > 0")
+        if not (duration > 0):
+            raise ValueError("duration must be > 0")
+
+        volume = self._clamp(volume if volume is not None else self.default_volume, 0.0, 1.0)
+        if waveform not in _WAVEFORMS:
+            raise ValueError("Unsupported waveform. Use 'sine' | 'square' | 'triangle' | 'saw'.")
+
+        sample_rate = self.sample_rate
+        num_samples = int(sample_rate * duration)
+        attack_samples = int(sample_rate * max(0.0, attack))
+        release_samples = int(sample_rate * max(0.0, release))
+        return self._pcm16_chunks(float(freq), sample_rate, num_samples, attack_samples,
+                                  release_samples, volume, waveform, chunk_samples)
+
+    def stream_note(
+        self,
+        note: str,
+        octave: int = 4,
+        duration: float = 1.0,
+        *,
+        volume: Optional[float] = None,
+        waveform: str = "sine",
+        attack: float = 0.01,
+        release: float = 0.05,
+    ) -> Generator[bytes, None, None]:
+        """Streaming counterpart of `synthesize_note`."""
+        freq = self.note_to_freq(note, octave)
+        return self.stream_tone(
+            freq,
+            duration,
+            volume=volume,
+            waveform=waveform,
+            attack=attack,
+            release=release,
+        )
+
     # ------- Helpers -------
 
+    @staticmethod
+    def _pcm16_chunks(
+        freq: float,
+        sample_rate: int,
+        num_samples: int,
+        attack_samples: int,
+        release_samples: int,
+        volume: float,
+        waveform: str,
+        chunk_samples: int,
+    ) -> Generator[bytes, None, None]:
+        yield _wav_header(num_samples * 2, sample_rate, num_channels=1, sampwidth=2)
+        for start in range(0, num_samples, chunk_samples):
+            count = min(chunk_samples, num_samples - start)
+            if _render_tone is not None:
+                pcm = np.empty(count, dtype=np.int16)
+                _render_tone(freq, sample_rate, num_samples, attack_samples, release_samples,
+                             volume, _WAVEFORM_IDS[waveform], pcm, start)
+                yield pcm.astype("<i2", copy=False).tobytes()
+            else:
+                yield AudioPlayer._render_pcm16(freq, sample_rate, num_samples, attack_samples,
+                                                release_samples, volume, waveform, start, count)
+
+    @staticmethod
+    def _render_pcm16(
+        freq: float,
+        sample_rate: int,
+        num_samples: int,
+        attack_samples: int,
+        release_samples: int,
+        volume: float,
+        waveform: str,
+        start: int = 0,
+        count: Optional[int] = None,
+    ) -> bytes:
+        """NumPy fallback used when Numba is not installed; renders samples [start, start + count)."""
+        stop = num_samples if count is None else start + count
+
+        # Generate raw floating samples in range [-1, 1] (one vectorized call per waveform)
+        n = np.arange(start, stop, dtype=np.float64)
+        samples = _WAVEFORMS[waveform](n, freq, sample_rate).astype(np.float32)
+
+        # Apply simple ADSR (attack-sustain-release) as linear ramps, one vector op each
+        attack_end = min(attack_samples, stop)
+        if start < attack_end:
+            samples[:attack_end - start] *= np.arange(start + 1, attack_end + 1, dtype=np.float32) / attack_samples
+        release_start = num_samples - release_samples
+        r0 = max(start, release_start)
+        if release_samples and r0 < stop:
+            ramp = np.arange(r0 - release_start + 1, stop - release_start + 1, dtype=np.float32)
+            samples[r0 - start:] *= 1.0 - ramp / release_samples
+
+        # No fancy sustain shaping; keep middle flat
+        # Scale by volume and convert to 16-bit PCM
+        return AudioPlayer._float_to_pcm16(samples, volume)
+
     def note_to_freq(self, note: str, octave: int) -> float:
         if not isinstance(note, str):
             raise ValueError("note must be a string like 'A', 'C#', 'Bb'")
@@ -174,38 +349,72 @@ class AudioPlayer:
         # Normalize flats to sharps
         name = self.ALT_NAMES.get(name, name)
 
+        freq = self._FREQ_TABLE.get((name, octave))
+        if freq is not None:
+            return freq
+
         if name not in self.NOTE_ORDER:
             raise ValueError(f"Invalid note name '{note}'. Use one of {self.NOTE_ORDER} or flats Bb, Eb, Ab...")
 
-        # MIDI number approach: A4 (MIDI 69) = 440 Hz
-        semitone_index = self.NOTE_ORDER.index(name)
-        midi_num = (octave + 1) * 12 + semitone_index  # MIDI standard: C-1 = 0
-        n = midi_num - 69  # distance from A4
-        freq = self.A4_FREQ * (2.0 ** (n / 12.0))
-        return float(freq)
+        # Octaves outside the precomputed table
+        return _equal_tempered_freq(self.A4_FREQ, self.NOTE_ORDER.index(name), octave)
 
     @staticmethod
     def _clamp(x: float, lo: float, hi: float) -> float:
         return max(lo, min(hi, float(x)))
 
     @staticmethod
-    def _float_to_pcm16(samples: Iterable[float], volume: float) -> bytes:
-        # clamp and scale
-        out = io.BytesIO()
-        for s in samples:
-            s = max(-1.0, min(1.0, float(s))) * volume
-            out.write(struct.pack('<h', int(s * 32767.0)))
-        return out.getvalue()
+    def _float_to_pcm16(samples: np.ndarray, volume: float) -> bytes:
+        # scale into a fresh float64 buffer, then clamp it in place (astype truncates toward zero, like int())
+        scale = volume * 32767.0
+        scaled = np.multiply(samples, scale, dtype=np.float64)
+        np.clip(scaled, -scale, scale, out=scaled)
+        return scaled.astype("<i2").tobytes()
 
     @staticmethod
     def _pcm_to_wav(pcm_bytes: bytes, sample_rate: int, num_channels: int, sampwidth: int) -> bytes:
-        buf = io.BytesIO()
-        with wave.open(buf, "wb") as wf:
-            wf.setnchannels(num_channels)
-            wf.setsampwidth(sampwidth)
-            wf.setframerate(sample_rate)
-            wf.writeframes(pcm_bytes)
-        return buf.getvalue()
+        return _wav_header(len(pcm_bytes), sample_rate, num_channels, sampwidth) + pcm_bytes
+
+
+def _wav_header(data_size: int, sample_rate: int, num_channels: int, sampwidth: int) -> bytes:
+    """Pack the fixed 44-byte RIFF/WAVE header for a PCM payload of `data_size` bytes."""
+    block_align = num_channels * sampwidth
+    byte_rate = sample_rate * block_align
+    return struct.pack(
+        "<4sI4s4sIHHIIHH4sI",
+        b"RIFF", 36 + data_size, b"WAVE",
+        b"fmt ", 16, 1, num_channels, sample_rate, byte_rate, block_align, sampwidth * 8,
+        b"data", data_size,
+    )
+
+
+@lru_cache(maxsize=512)
+def _synthesize_wav(
+    freq: float,
+    duration: float,
+    volume: float,
+    waveform: str,
+    attack: float,
+    release: float,
+    sample_rate: int,
+) -> bytes:
+    """Render a tone to WAV bytes; memoized since the same notes are requested repeatedly."""
+    num_samples = int(sample_rate * duration)
+    attack_samples = int(sample_rate * max(0.0, attack))
+    release_samples = int(sample_rate * max(0.0, release))
+
+    if _render_tone is not None:
+        # Fused waveform + ADSR + 16-bit quantization in a single compiled pass
+        pcm = np.empty(num_samples, dtype=np.int16)
+        _render_tone(freq, sample_rate, num_samples, attack_samples, release_samples,
+                     volume, _WAVEFORM_IDS[waveform], pcm)
+        pcm_bytes = pcm.astype("<i2", copy=False).tobytes()
+    else:
+        pcm_bytes = AudioPlayer._render_pcm16(freq, sample_rate, num_samples, attack_samples,
+                                              release_samples, volume, waveform)
+
+    # Wrap as WAV
+    return AudioPlayer._pcm_to_wav(pcm_bytes, sample_rate, num_channels=1, sampwidth=2)
 
 # ---------------------------
 # FastAPI Router (optional)
@@ -224,17 +433,24 @@ def _safe_join(base: Path, *paths: str) -> Path:
         raise HTTPException(status_code=400, detail="Invalid path.")
     return candidate
 
+def _walk_audio_files(directory: Path) -> Generator[str, None, None]:
+    """Yield file paths under `directory` relative to BASE_AUDIO_DIR (uses cached DirEntry types)."""
+    with os.scandir(directory) as it:
+        for entry in it:
+            if entry.is_dir(follow_symlinks=False):
+                yield from _walk_audio_files(entry.path)
+            elif entry.is_file():
+                yield os.path.relpath(entry.path, BASE_AUDIO_DIR)
+
+_MIME_TYPES = {
+    ".wav": "audio/wav",
+    ".mp3": "audio/mpeg",
+    ".ogg": "audio/ogg",
+    ".m4a": "audio/mp4",
+}
+
 def _detect_mime(path: Path) -> str:
-    ext = path.suffix.lower()
-    if ext == ".wav":
-        return "audio/wav"
-    if ext == ".mp3":
-        return "audio/mpeg"
-    if ext == ".ogg":
-        return "audio/ogg"
-    if ext == ".m4a":
-        return "audio/mp4"
-    return "application/octet-stream"
+    return _MIME_TYPES.get(path.suffix.lower(), "application/octet-stream")
 
 def _file_chunker(path: Path, start: int, end: int, chunk_size: int = 64 * 1024) -> Generator[bytes, None, None]:
     with open(path, "rb") as f:
@@ -249,6 +465,14 @@ def _file_chunker(path: Path, start: int, end: int, chunk_size: int = 64 * 1024)
             remaining -= len(data)
 
 def _serve_range_file(path: Path, range_header: Optional[str]) -> StreamingResponse:
+    if range_header is None:
+        # Whole file: let FileResponse hand it to the kernel (sendfile) instead of chunking in Python
+        return FileResponse(
+            path,
+            media_type=_detect_mime(path),
+            headers={"Accept-Ranges": "bytes", "Cache-Control": "public, max-age=3600"},
+        )
+
     file_size = path.stat().st_size
     start = 0
     end = file_size - 1
@@ -280,6 +504,24 @@ def _serve_range_file(path: Path, range_header: Optional[str]) -> StreamingRespo
     }
     return StreamingResponse(chunk_iter, media_type=_detect_mime(path), status_code=status_code, headers=headers)
 
+@lru_cache(maxsize=1)
+def _default_player() -> AudioPlayer:
+    """Shared AudioPlayer for the endpoints (default sample rate and volume)."""
+    return AudioPlayer()
+
+# Tones up to this long are served whole from the `_synthesize_wav` cache (a 1 s note is ~88 KB);
+# only longer renders are streamed chunk by chunk
+STREAM_MIN_DURATION = 2.0
+
+def _tone_response(freq: float, duration: float, waveform: str, volume: float) -> Response:
+    """WAV response for a synthesized tone: cached bytes when short, a stream when long."""
+    ap = _default_player()
+    if duration <= STREAM_MIN_DURATION:
+        wav = ap.synthesize_tone(freq, duration, waveform=waveform, volume=volume)
+        return Response(wav, media_type="audio/wav")
+    chunks = ap.stream_tone(freq=freq, duration=duration, waveform=waveform, volume=volume)
+    return StreamingResponse(chunks, media_type="audio/wav")
+
 # Expose router only if FastAPI is installed
 if APIRouter is not None:
     router = APIRouter(prefix="/audio", tags=["audio"])
@@ -287,11 +529,7 @@ if APIRouter is not None:
     @router.get("/list")
     def list_audio_files() -> List[str]:
         """List files under ./static/audio (relative names)."""
-        files = []
-        for p in BASE_AUDIO_DIR.glob("**/*"):
-            if p.is_file():
-                files.append(str(p.relative_to(BASE_AUDIO_DIR)))
-        return files
+        return list(_walk_audio_files(BASE_AUDIO_DIR))
 
     @router.get("/stream/{relpath:path}")
     def stream_audio(relpath: str, request: Request):
@@ -312,12 +550,11 @@ if APIRouter is not None:
         volume: float = Query(0.8, ge=0.0, le=1.0),
     ) -> Response:
         """Synthesize a note on the fly and return WAV bytes."""
-        ap = AudioPlayer()
         try:
-            data = ap.synthesize_note(note=note, octave=octave, duration=duration, waveform=waveform, volume=volume)
+            freq = _default_player().note_to_freq(note, octave)
         except ValueError as e:
             raise HTTPException(status_code=400, detail=str(e))
-        return Response(content=data, media_type="audio/wav")
+        return _tone_response(freq, duration, waveform, volume)
 
     @router.get("/tone")
     def synth_tone(
@@ -326,8 +563,6 @@ if APIRouter is not None:
         waveform: str = Query("sine", pattern="^(sine|square|triangle|saw)$"),
         volume: float = Query(0.8, ge=0.0, le=1.0),
     ) -> Response:
-        ap = AudioPlayer()
-        data = ap.synthesize_tone(freq=freq, duration=duration, waveform=waveform, volume=volume)
-        return Response(content=data, media_type="audio/wav")
+        return _tone_response(freq, duration, waveform, volume)
 else:  # FastAPI not available - expose a placeholder so import doesn't fail
     router = None  # type: ignore
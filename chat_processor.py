@@ -5,47 +5,115 @@ from music_theory import MusicTheoryTeacher
 
 logger = logging.getLogger(__name__)
 
+# Respostas fixas (HTML) reutilizadas pelo ChatProcessor
+CIRCLE_OF_FIFTHS_INFO = """
+        <strong>🔄 Círculo das Quintas:</strong><br><br>
+        <strong>Sentido horário (sustenidos):</strong><br>
+        C → G → D → A → E → B → F# → C#<br><br>
+        <strong>Sentido anti-horário (bemóis):</strong><br>
+        C → F → Bb → Eb → Ab → Db → Gb → Cb<br><br>
+        <strong>💡 Dica:</strong> É uma ferramenta fundamental para entender relações entre tonalidades e progressões harmônicas. 
+        Cada movimento no sentido horário adiciona um sustenido, no anti-horário adiciona um bemol.
+        """
+
+EXERCISE_INFO = """
+        <strong>🎯 Exercícios Disponíveis:</strong><br><br>
+        Use os botões na seção "Exercícios Musicais" para gerar:<br><br>
+        • <strong>🎼 Intervalos</strong> - Identificação de intervalos entre notas<br>
+        • <strong>🎸 Acordes</strong> - Formação e análise de acordes<br>
+        • <strong>🎵 Escalas</strong> - Construção de escalas musicais<br><br>
+        Os exercícios são gerados automaticamente e ajudam você a praticar e fixar o conhecimento! 📚
+        """
+
+DEFAULT_RESPONSE = """
+        Ainda não sei responder essa pergunta específica, mas estou aprendendo! 🎵<br><br>
+        <strong>📚 Posso ajudar com:</strong><br>
+        • <strong>Escalas:</strong> "escala de D maior"<br>
+        • <strong>Acordes:</strong> "acorde G7" ou "como formar C menor"<br>
+        • <strong>Campo harmônico:</strong> "campo harmônico de A menor"<br>
+        • <strong>Intervalos:</strong> "intervalo entre F e A"<br>
+        • <strong>Modos:</strong> "modo C mixolídio"<br>
+        • <strong>Teoria geral:</strong> "círculo das quintas"<br><br>
+        <strong>🎯 Também posso gerar exercícios para você praticar!</strong><br>
+        Use os botões na seção de exercícios ou envie um arquivo de áudio para análise.
+        """
+
 class ChatProcessor:
     """Processador de mensagens do chat musical."""
     
+    # Tabela de remoção de acentos usada por normalize_message
+    _ACCENT_TABLE = str.maketrans({
+        'á': 'a', 'à': 'a', 'ã': 'a', 'â': 'a',
+        'é': 'e', 'ê': 'e',
+        'í': 'i', 'î': 'i',
+        'ó': 'o', 'ô': 'o', 'õ': 'o',
+        'ú': 'u', 'û': 'u',
+        'ç': 'c'
+    })
+    
+    # Padrões regex para reconhecimento de perguntas, compilados uma única vez na classe
+    patterns = {
+        'campo_harmonico': re.compile(
+            r'campo harm[oô]nico.*?(?:de\s+)?([a-g]#?)\s*(maior|menor)?',
+            re.IGNORECASE
+        ),
+        'escala': re.compile(
+            r'escala.*?(?:de\s+)?([a-g]#?)\s*(maior|menor)?',
+            re.IGNORECASE
+        ),
+        'acorde': re.compile(
+            r'(?:acorde\s+)?([a-g]#?)\s*(maior|menor|m|7|maj7|dim|aug)?',
+            re.IGNORECASE
+        ),
+        'intervalo': re.compile(
+            r'intervalo.*?entre\s+([a-g]#?)\s+e\s+([a-g]#?)',
+            re.IGNORECASE
+        ),
+        'modo': re.compile(
+            r'(?:modo\s+)?([a-g]#?)\s*(j[oô]nio|d[oó]rico|fr[ií]gio|l[ií]dio|mixol[ií]dio|e[oó]lio|l[oó]crio)',
+            re.IGNORECASE
+        ),
+        'formacao_acorde': re.compile(
+            r'(?:como\s+formar|forma[çc][aã]o.*?do?)\s+(?:acorde\s+)?([a-g]#?)\s*(maior|menor|m|7)?',
+            re.IGNORECASE
+        )
+    }
+    
+    # Padrões simples como "C", "Am", "G7"
+    simple_chord_pattern = re.compile(
+        r'^[a-g]#?(?:m|maj|dim|aug|7|maj7|m7|dim7)?$',
+        re.IGNORECASE
+    )
+    
+    # Nomes dos modos gregos, com e sem acento
+    modes_pattern = re.compile(
+        r'j[oô]nio|d[oó]rico|fr[ií]gio|l[ií]dio|mixol[ií]dio|e[oó]lio|l[oó]crio',
+        re.IGNORECASE
+    )
+    
+    # Palavras-chave de cada tipo de pergunta numa única alternação: uma só
+    # varredura da mensagem identifica todos os tipos presentes
+    intent_pattern = re.compile(
+        r'(?P<campo_harmonico>campo harm[oô]nico)'
+        r'|(?P<escala>escala)'
+        r'|(?P<formacao_acorde>como formar|forma[cç][aã]o)'
+        r'|(?P<acorde>acorde)'
+        r'|(?P<intervalo>intervalo)'
+        r'|(?P<entre>entre)'
+        r'|(?P<modo>j[oô]nio|d[oó]rico|fr[ií]gio|l[ií]dio|mixol[ií]dio|e[oó]lio|l[oó]crio)'
+        r'|(?P<circulo>c[ií]rculo|ciclo)'
+        r'|(?P<exercicio>exerc[ií]cio)',
+        re.IGNORECASE
+    )
+    
     def __init__(self, theory_teacher: MusicTheoryTeacher):
         self.theory_teacher = theory_teacher
-        self.setup_patterns()
-    
-    def setup_patterns(self):
-        """Define os padrões regex para reconhecimento de perguntas."""
-        self.patterns = {
-            'campo_harmonico': re.compile(
-                r'campo harm[oô]nico.*?(?:de\s+)?([a-g]#?)\s*(maior|menor)?',
-                re.IGNORECASE
-            ),
-            'escala': re.compile(
-                r'escala.*?(?:de\s+)?([a-g]#?)\s*(maior|menor)?',
-                re.IGNORECASE
-            ),
-            'acorde': re.compile(
-                r'(?:acorde\s+)?([a-g]#?)\s*(maior|menor|m|7|maj7|dim|aug)?',
-                re.IGNORECASE
-            ),
-            'intervalo': re.compile(
-                r'intervalo.*?entre\s+([a-g]#?)\s+e\s+([a-g]#?)',
-                re.IGNORECASE
-            ),
-            'modo': re.compile(
-                r'(?:modo\s+)?([a-g]#?)\s*(j[oô]nio|d[oó]rico|fr[ií]gio|l[ií]dio|mixol[ií]dio|e[oó]lio|l[oó]crio)',
-                re.IGNORECASE
-            ),
-            'formacao_acorde': re.compile(
-                r'(?:como\s+formar|forma[çc][aã]o.*?do?)\s+(?:acorde\s+)?([a-g]#?)\s*(maior|menor|m|7)?',
-                re.IGNORECASE
-            )
-        }
     
     def process_message(self, message: str) -> str:
         """Processa uma mensagem e retorna a resposta."""
         try:
             message = message.strip()
-            logger.info(f"Processando mensagem: {message}")
+            logger.info("Processando mensagem: %s", message)
             
             # Normaliza a mensagem
             normalized_message = self.normalize_message(message)
@@ -60,104 +128,95 @@ class ChatProcessor:
             return self.get_default_response()
             
         except Exception as e:
-            logger.error(f"Erro ao processar mensagem: {str(e)}")
+            logger.error("Erro ao processar mensagem: %s", e)
             return "Desculpe, ocorreu um erro ao processar sua pergunta. Tente novamente."
     
     def normalize_message(self, message: str) -> str:
         """Normaliza a mensagem para melhor processamento."""
-        # Remove acentos e caracteres especiais desnecessários
-        replacements = {
-            'á': 'a', 'à': 'a', 'ã': 'a', 'â': 'a',
-            'é': 'e', 'ê': 'e',
-            'í': 'i', 'î': 'i',
-            'ó': 'o', 'ô': 'o', 'õ': 'o',
-            'ú': 'u', 'û': 'u',
-            'ç': 'c'
-        }
-        
-        normalized = message.lower()
-        for old, new in replacements.items():
-            normalized = normalized.replace(old, new)
-        
-        return normalized
+        # Remove acentos com uma única passada pela tabela de tradução
+        return message.lower().translate(self._ACCENT_TABLE)
     
     def identify_and_process(self, message: str) -> Optional[str]:
         """Identifica o tipo de pergunta e processa adequadamente."""
         
+        # Posição da primeira ocorrência de cada palavra-chave; os handlers cujo
+        # regex começa pela mesma palavra retomam a busca a partir dela
+        intents = {}
+        for match in self.intent_pattern.finditer(message):
+            intents.setdefault(match.lastgroup, match.start())
+        
         # Campo harmônico
-        if 'campo harmonico' in message or 'campo harmônico' in message:
-            return self.process_harmonic_field_question(message)
+        if 'campo_harmonico' in intents:
+            return self.process_harmonic_field_question(message, intents['campo_harmonico'])
         
         # Escala
-        if 'escala' in message:
-            return self.process_scale_question(message)
+        if 'escala' in intents:
+            return self.process_scale_question(message, intents['escala'])
         
         # Formação de acorde
-        if any(phrase in message for phrase in ['como formar', 'formacao', 'formação']):
+        if 'formacao_acorde' in intents:
             return self.process_chord_formation_question(message)
         
         # Acorde específico
-        if 'acorde' in message or self.is_chord_query(message):
+        if 'acorde' in intents or self.is_chord_query(message):
             return self.process_chord_question(message)
         
         # Intervalo
-        if 'intervalo' in message and 'entre' in message:
-            return self.process_interval_question(message)
+        if 'intervalo' in intents and 'entre' in intents:
+            return self.process_interval_question(message, intents['intervalo'])
         
         # Modo
-        if self.is_mode_query(message):
+        if 'modo' in intents:
             return self.process_mode_question(message)
         
         # Perguntas gerais
-        if 'circulo' in message or 'círculo' in message or 'ciclo' in message:
+        if 'circulo' in intents:
             return self.get_circle_of_fifths_info()
         
-        if 'exercicio' in message or 'exercício' in message:
+        if 'exercicio' in intents:
             return self.get_exercise_info()
         
         return None
     
-    def process_harmonic_field_question(self, message: str) -> str:
+    def process_harmonic_field_question(self, message: str, pos: int = 0) -> str:
         """Processa perguntas sobre campo harmônico."""
-        match = self.patterns['campo_harmonico'].search(message)
+        match = self.patterns['campo_harmonico'].search(message, pos)
         
         if not match:
             return "Especifique a tonalidade. Exemplo: 'campo harmônico de C maior'"
         
         tonica = match.group(1).upper()
-        modo = match.group(2) or 'maior'  # Padrão é maior
-        
-        mode_eng = 'minor' if 'menor' in modo.lower() else 'major'
+        # A mensagem já chega em minúsculas; sem qualidade, o padrão é maior
+        mode_eng = 'minor' if match.group(2) == 'menor' else 'major'
         resultado = self.theory_teacher.explain_harmonic_field(tonica, mode_eng)
         
         if "erro" in resultado:
             return f"❌ {resultado['erro']}"
         
         # Formata a resposta
-        acordes_info = []
-        for acorde in resultado["acordes"]:
-            acordes_info.append(f"<strong>{acorde['grau']}</strong> - {acorde['cifra']} ({acorde['funcao']})")
+        acordes_info = ' <br>'.join(
+            f"<strong>{acorde['grau']}</strong> - {acorde['cifra']} ({acorde['funcao']})"
+            for acorde in resultado["acordes"]
+        )
         
         progressoes = "<br>".join(resultado["progressoes_comuns"])
         
         return f"""
         <strong>🎼 Campo harmônico de {resultado['tonalidade']}:</strong><br><br>
-        {' <br>'.join(acordes_info)}<br><br>
+        {acordes_info}<br><br>
         <strong>📝 Progressões comuns:</strong><br>
         {progressoes}
         """
     
-    def process_scale_question(self, message: str) -> str:
+    def process_scale_question(self, message: str, pos: int = 0) -> str:
         """Processa perguntas sobre escalas."""
-        match = self.patterns['escala'].search(message)
+        match = self.patterns['escala'].search(message, pos)
         
         if not match:
             return "Especifique a escala. Exemplo: 'escala de D maior'"
         
         tonica = match.group(1).upper()
-        modo = match.group(2) or 'maior'
-        
-        scale_type = 'minor' if 'menor' in modo.lower() else 'major'
+        scale_type = 'minor' if match.group(2) == 'menor' else 'major'
         resultado = self.theory_teacher.explain_scale(tonica, scale_type)
         
         if "erro" in resultado:
@@ -204,7 +263,7 @@ class ChatProcessor:
         <strong>Notas:</strong> {' - '.join(resultado['notas'])}<br>
         <strong>Intervalos:</strong> {', '.join(resultado['intervalos'])}<br>
         <strong>Descrição:</strong> {resultado['descricao']}<br>
-        <strong>Cifra:</strong> {resultado['cifra']}
+        <strong>Progressão sugerida:</strong> {resultado['exemplo_progressao']}
         """
     
     def process_chord_question(self, message: str) -> str:
@@ -241,9 +300,9 @@ class ChatProcessor:
         <strong>Descrição:</strong> {resultado['descricao']}
         """
     
-    def process_interval_question(self, message: str) -> str:
+    def process_interval_question(self, message: str, pos: int = 0) -> str:
         """Processa perguntas sobre intervalos."""
-        match = self.patterns['intervalo'].search(message)
+        match = self.patterns['intervalo'].search(message, pos)
         
         if not match:
             return "Especifique as duas notas. Exemplo: 'intervalo entre C e E'"
@@ -304,55 +363,23 @@ class ChatProcessor:
     
     def is_chord_query(self, message: str) -> bool:
         """Verifica se a mensagem é uma consulta sobre acorde."""
-        # Padrões simples como "C", "Am", "G7"
-        simple_chord_pattern = re.compile(r'^[a-g]#?(?:m|maj|dim|aug|7|maj7|m7|dim7)?$', re.IGNORECASE)
-        return bool(simple_chord_pattern.match(message.strip()))
+        return bool(self.simple_chord_pattern.match(message.strip()))
     
     def is_mode_query(self, message: str) -> bool:
         """Verifica se a mensagem é sobre modos."""
-        modos = ['jonio', 'jônio', 'dorico', 'dórico', 'frigio', 'frígio', 
-                'lidio', 'lídio', 'mixolidio', 'mixolídio', 'eolio', 'eólio', 
-                'locrio', 'lócrio']
-        
-        return any(modo in message.lower() for modo in modos)
+        return bool(self.modes_pattern.search(message))
     
     def get_circle_of_fifths_info(self) -> str:
         """Retorna informações sobre o círculo das quintas."""
-        return """
-        <strong>🔄 Círculo das Quintas:</strong><br><br>
-        <strong>Sentido horário (sustenidos):</strong><br>
-        C → G → D → A → E → B → F# → C#<br><br>
-        <strong>Sentido anti-horário (bemóis):</strong><br>
-        C → F → Bb → Eb → Ab → Db → Gb → Cb<br><br>
-        <strong>💡 Dica:</strong> É uma ferramenta fundamental para entender relações entre tonalidades e progressões harmônicas. 
-        Cada movimento no sentido horário adiciona um sustenido, no anti-horário adiciona um bemol.
-        """
+        return CIRCLE_OF_FIFTHS_INFO
     
     def get_exercise_info(self) -> str:
         """Retorna informações sobre exercícios."""
-        return """
-        <strong>🎯 Exercícios Disponíveis:</strong><br><br>
-        Use os botões na seção "Exercícios Musicais" para gerar:<br><br>
-        • <strong>🎼 Intervalos</strong> - Identificação de intervalos entre notas<br>
-        • <strong>🎸 Acordes</strong> - Formação e análise de acordes<br>
-        • <strong>🎵 Escalas</strong> - Construção de escalas musicais<br><br>
-        Os exercícios são gerados automaticamente e ajudam você a praticar e fixar o conhecimento! 📚
-        """
+        return EXERCISE_INFO
     
     def get_default_response(self) -> str:
         """Retorna resposta padrão quando não reconhece a pergunta."""
-        return """
-        Ainda não sei responder essa pergunta específica, mas estou aprendendo! 🎵<br><br>
-        <strong>📚 Posso ajudar com:</strong><br>
-        • <strong>Escalas:</strong> "escala de D maior"<br>
-        • <strong>Acordes:</strong> "acorde G7" ou "como formar C menor"<br>
-        • <strong>Campo harmônico:</strong> "campo harmônico de A menor"<br>
-        • <strong>Intervalos:</strong> "intervalo entre F e A"<br>
-        • <strong>Modos:</strong> "modo C mixolídio"<br>
-        • <strong>Teoria geral:</strong> "círculo das quintas"<br><br>
-        <strong>🎯 Também posso gerar exercícios para você praticar!</strong><br>
-        Use os botões na seção de exercícios ou envie um arquivo de áudio para análise.
-        """
+        return DEFAULT_RESPONSE
     
     def extract_note_from_text(self, text: str) -> Optional[str]:
         """Extrai uma nota musical do texto."""
@@ -1,9 +1,16 @@
-from fastapi import FastAPI, UploadFile, File
+from fastapi import FastAPI, Request, UploadFile, File
+from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import HTMLResponse
-from pydantic import BaseModel
-import music21 as m21
+from fastapi.responses import HTMLResponse, ORJSONResponse, Response
+from pydantic import BaseModel, Field
+import asyncio
+import contextlib
+import gzip
+import hashlib
 import os
+import queue
+import random
+import re
 import tempfile
 from audio_analysis import AudioAnalyzer, generate_basic_chord_progression
 from music_theory import MusicTheoryTeacher, generate_exercise
@@ -11,17 +18,84 @@ from audio_player import AudioPlayer
 
 from audio_player import router as audio_router
 
+_RNG = random.Random()
 
-app = FastAPI()
+
+def _aquecer():
+    """Compila os núcleos Numba (análise e síntese) e preenche o cache dos 24 campos harmônicos
+    (12 tônicas x maior/menor) antes do primeiro pedido. A análise completa de um áudio sintético,
+    que também aquece o librosa, é opcional (AQUECIMENTO_COMPLETO=1) por ser lenta em cada worker."""
+    if os.getenv("AQUECIMENTO_COMPLETO") == "1":
+        audio_analyzer.warmup()
+    else:
+        audio_analyzer.warmup_kernels()
+    audio_player.synthesize_tone(440.0, 0.01)
+    for tonica in theory_teacher.note_names:
+        for modo in ("major", "minor"):
+            theory_teacher.explain_harmonic_field(tonica, modo)
+
+@contextlib.asynccontextmanager
+async def ciclo_de_vida(app: FastAPI):
+    await asyncio.to_thread(_aquecer)
+    yield
+
+app = FastAPI(default_response_class=ORJSONResponse, lifespan=ciclo_de_vida)
+# Comprime as respostas de texto/JSON maiores; áudio e respostas parciais passam direto
+app.add_middleware(GZipMiddleware, minimum_size=1024)
 app.include_router(audio_router)
 
+class CachedStaticFiles(StaticFiles):
+    """StaticFiles que permite ao navegador guardar os arquivos de áudio em cache."""
+    
+    AUDIO_EXTENSIONS = (".wav", ".mp3", ".ogg", ".m4a")
+    
+    async def get_response(self, path: str, scope):
+        response = await super().get_response(path, scope)
+        if path.lower().endswith(self.AUDIO_EXTENSIONS):
+            response.headers["Cache-Control"] = "public, max-age=86400"
+        return response
+
 # Servir arquivos estáticos
-app.mount("/static", StaticFiles(directory="static"), name="static")
+app.mount("/static", CachedStaticFiles(directory="static"), name="static")
 
 # Inicializa o analisador de áudio e professor de teoria
 audio_analyzer = AudioAnalyzer()
 theory_teacher = MusicTheoryTeacher()
 audio_player = AudioPlayer()
+gerador_exercicios = generate_exercise(theory_teacher)
+
+# Conjunto das notas para busca O(1) nos laços sobre as palavras da pergunta
+NOTE_NAMES = frozenset(theory_teacher.note_names)
+
+# Página inicial lida uma única vez na inicialização; a resposta já fica montada
+with open("index.html", "r", encoding="utf-8") as f:
+    INDEX_HTML = f.read()
+# ETag derivado do conteúdo, para o navegador revalidar com 304 em vez de baixar a página de novo
+HOME_ETAG = '"' + hashlib.md5(INDEX_HTML.encode("utf-8")).hexdigest() + '"'
+HOME_ETAG_GZIP = HOME_ETAG[:-1] + '-gzip"'
+HOME_CACHE_CONTROL = "public, max-age=3600"
+HOME_RESPONSE = HTMLResponse(INDEX_HTML, headers={"Cache-Control": HOME_CACHE_CONTROL, "ETag": HOME_ETAG})
+# Versão já comprimida da página, para não recomprimir os ~40 KB a cada acesso
+HOME_RESPONSE_GZIP = HTMLResponse(
+    gzip.compress(INDEX_HTML.encode("utf-8"), compresslevel=9),
+    headers={"Content-Encoding": "gzip", "Vary": "Accept-Encoding",
+             "Cache-Control": HOME_CACHE_CONTROL, "ETag": HOME_ETAG_GZIP},
+)
+
+# Limites para upload de áudio
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+MAX_UPLOAD_SIZE = 50 * 1024 * 1024
+
+# Buffers de leitura do upload reaproveitados entre pedidos, em vez de um bytes novo por bloco.
+# O pool é limitado: buffers extras criados sob pico são descartados ao final do pedido
+UPLOAD_BUFFERS_MAX = 4
+_UPLOAD_BUFFERS = queue.Queue(maxsize=UPLOAD_BUFFERS_MAX)
+for _ in range(UPLOAD_BUFFERS_MAX):
+    _UPLOAD_BUFFERS.put(bytearray(UPLOAD_CHUNK_SIZE))
+
+# Limita quantas análises pesadas rodam ao mesmo tempo neste worker. O limite é por processo e o
+# servidor já sobe um worker por núcleo, então por padrão cada worker roda uma análise por vez
+_ANALISES_SIMULTANEAS = asyncio.Semaphore(int(os.getenv("ANALISES_POR_WORKER", "1")))
 
 class Pergunta(BaseModel):
     texto: str
@@ -31,245 +105,319 @@ class ExerciseRequest(BaseModel):
 
 class PlayNoteRequest(BaseModel):
     note: str
-    octave: int = 4
-    duration: float = 1.0
+    # Mesmos limites de /audio/note
+    octave: int = Field(4, ge=0, le=8)
+    duration: float = Field(1.0, gt=0, le=10.0)
+
+@app.exception_handler(ValueError)
+async def erro_entrada(request: Request, exc: ValueError):
+    """Entrada inválida (a validação de notas levanta ValueError): mesmo envelope de erro, com status 400."""
+    return ORJSONResponse({"sucesso": False, "erro": str(exc)}, status_code=400)
+
+@app.exception_handler(Exception)
+async def erro_interno(request: Request, exc: Exception):
+    """Envelope de erro único para falhas internas dos endpoints."""
+    return ORJSONResponse({"sucesso": False, "erro": str(exc)}, status_code=500)
 
 @app.get("/")
-def home():
-    with open("index.html", "r", encoding="utf-8") as f:
-        return HTMLResponse(f.read())
+async def home(request: Request):
+    usa_gzip = "gzip" in request.headers.get("accept-encoding", "")
+    etag = HOME_ETAG_GZIP if usa_gzip else HOME_ETAG
+    if etag in request.headers.get("if-none-match", ""):
+        return Response(status_code=304, headers={"Cache-Control": HOME_CACHE_CONTROL, "ETag": etag, "Vary": "Accept-Encoding"})
+    return HOME_RESPONSE_GZIP if usa_gzip else HOME_RESPONSE
+
+def _obter_buffer_upload() -> bytearray:
+    """Pega um buffer reutilizável do pool (ou cria um novo se todos estiverem em uso)."""
+    try:
+        return _UPLOAD_BUFFERS.get_nowait()
+    except queue.Empty:
+        return bytearray(UPLOAD_CHUNK_SIZE)
+
+def _copiar_upload(origem, destino) -> int:
+    """Copia o upload para o destino em blocos; para ao passar de MAX_UPLOAD_SIZE e devolve o total lido."""
+    tamanho = 0
+    buffer = _obter_buffer_upload()
+    try:
+        with memoryview(buffer) as view:
+            while lidos := origem.readinto(buffer):
+                tamanho += lidos
+                if tamanho > MAX_UPLOAD_SIZE:
+                    break
+                destino.write(view[:lidos])
+    finally:
+        with contextlib.suppress(queue.Full):
+            _UPLOAD_BUFFERS.put_nowait(buffer)
+    return tamanho
+
+def _remover_temporario(caminho: str) -> None:
+    """Remove um arquivo temporário, ignorando se ele já não existir."""
+    with contextlib.suppress(FileNotFoundError):
+        os.unlink(caminho)
 
 @app.post("/analisar_audio")
 async def analisar_audio(file: UploadFile = File(...)):
     """Endpoint para análise de arquivos de áudio."""
+    # Salva o arquivo temporariamente, copiando em blocos para não manter o upload inteiro na memória
+    # Mantém a extensão original (mp3, ogg...) para o decodificador não tentar o formato errado primeiro
+    sufixo = os.path.splitext(file.filename or "")[1].lower() or ".wav"
+    temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=sufixo)
     try:
-        # Salva o arquivo temporariamente
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".wav") as temp_file:
-            content = await file.read()
-            temp_file.write(content)
-            temp_file_path = temp_file.name
+        with temp_file:
+            # Leitura e escrita numa única ida à thread, fora do event loop
+            tamanho = await asyncio.to_thread(_copiar_upload, file.file, temp_file)
         
-        # Analisa o áudio
-        resultado = audio_analyzer.analyze_audio_file(temp_file_path)
+        if tamanho > MAX_UPLOAD_SIZE:
+            return ORJSONResponse({"sucesso": False, "erro": f"Arquivo muito grande (máximo de {MAX_UPLOAD_SIZE // (1024 * 1024)} MB)."})
         
-        # Remove o arquivo temporário
-        os.unlink(temp_file_path)
-        
-        # Gera progressão de acordes se a tonalidade global foi detectada
-        if "tonalidade_global" in resultado and "erro" not in resultado:
-            progressao = generate_basic_chord_progression(resultado["tonalidade_global"])
-            resultado["progressao_sugerida"] = progressao
-        
-        return {"sucesso": True, "analise": resultado}
-        
-    except Exception as e:
-        return {"sucesso": False, "erro": str(e)}
+        # Analisa o áudio numa thread para não bloquear o event loop
+        async with _ANALISES_SIMULTANEAS:
+            resultado = await asyncio.to_thread(audio_analyzer.analyze_audio_file, temp_file.name)
+    finally:
+        # Único ponto de limpeza (sucesso, arquivo grande ou erro), sem bloquear o event loop
+        await asyncio.to_thread(_remover_temporario, temp_file.name)
+    
+    # Gera progressão de acordes se a tonalidade global foi detectada
+    if "tonalidade_global" in resultado and "erro" not in resultado:
+        resultado["progressao_sugerida"] = generate_basic_chord_progression(resultado["tonalidade_global"])
+    
+    # ORJSONResponse direto: evita o jsonable_encoder percorrendo toda a análise (e aceita tipos numpy)
+    return ORJSONResponse({"sucesso": True, "analise": resultado})
+
+def _exercicio_progressao() -> dict:
+    """Progressão de acordes num campo harmônico sorteado."""
+    return gerador_exercicios.create_chord_progression_exercise(
+        theory_teacher.note_names[_RNG.randrange(12)], ("maior", "menor")[_RNG.getrandbits(1)]
+    )
+
+# Tipo de exercício -> gerador (todos usam o professor compartilhado do módulo)
+GERADORES_EXERCICIO = {
+    "progression": _exercicio_progressao,
+}
 
 @app.post("/gerar_exercicio")
-def gerar_exercicio(request: ExerciseRequest):
+async def gerar_exercicio(request: ExerciseRequest):
     """Endpoint para gerar exercícios de teoria musical."""
-    try:
-        exercicio = generate_exercise(request.tipo)
-        return {"sucesso": True, "exercicio": exercicio}
-    except Exception as e:
-        return {"sucesso": False, "erro": str(e)}
+    gerador = GERADORES_EXERCICIO.get(request.tipo.lower())
+    if gerador is None:
+        return {"sucesso": False, "erro": f"Tipo de exercício '{request.tipo}' não disponível."}
+    return {"sucesso": True, "exercicio": gerador()}
 
 @app.post("/tocar_nota")
 def tocar_nota(request: PlayNoteRequest):
-    """Endpoint para tocar uma nota musical."""
-    try:
-        audio_data = audio_player.generate_note(request.note, request.octave, request.duration)
-        audio_file_path = audio_player.save_audio_to_file(audio_data, f"nota_{request.note}_{request.octave}")
-        return {"sucesso": True, "audio_url": audio_file_path}
-    except Exception as e:
-        return {"sucesso": False, "erro": str(e)}
+    """Endpoint para tocar uma nota musical: devolve o WAV na própria resposta."""
+    # synthesize_note já guarda em cache o WAV de cada (frequência, duração)
+    wav_bytes = audio_player.synthesize_note(request.note, request.octave, request.duration)
+    etag = f'"{request.note.strip().upper()}-{request.octave}-{request.duration:g}"'
+    return Response(
+        content=wav_bytes,
+        media_type="audio/wav",
+        headers={"Cache-Control": "public, max-age=86400", "ETag": etag},
+    )
 
-@app.post("/perguntar")
-def perguntar(pergunta: Pergunta):
-    texto = pergunta.texto.lower()
+# Palavras-chave de cada tipo de pergunta. Cada alternativa fica dentro de um lookahead,
+# então uma única varredura do texto encontra todas as ocorrências, mesmo sobrepostas
+# (ex.: o "de" dentro de "acorde").
+INTENT_RE = re.compile(
+    r"(?=(?P<campo>campo harmônico)"
+    r"|(?P<escala>escala de)"
+    r"|(?P<formar>como formar|como fazer|formação)"
+    r"|(?P<acorde>acorde)"
+    r"|(?P<intervalo>intervalo)"
+    r"|(?P<entre>entre|de)"
+    r"|(?P<modo>modo)"
+    r"|(?P<nome_modo>jônio|dórico|frígio|lídio|mixolídio|eólio|lócrio)"
+    r"|(?P<cadencia>cadência)"
+    r"|(?P<funcao>função harmônica)"
+    r"|(?P<exercicio>exerc[ií]cio))"
+)
 
-    # Respostas sobre teoria musical usando o sistema de ensino
-    if "campo harmônico" in texto:
-        # Extrai tonalidade da pergunta
-        partes = texto.split("campo harmônico")
-        if len(partes) > 1:
-            tonalidade_texto = partes[1].strip()
-            if "de" in tonalidade_texto:
-                tonalidade_texto = tonalidade_texto.replace("de", "").strip()
-            
-            if "maior" in tonalidade_texto:
-                tonica = tonalidade_texto.replace("maior", "").strip().upper()
-                resultado = theory_teacher.explain_harmonic_field(tonica, "major")
-            elif "menor" in tonalidade_texto:
-                tonica = tonalidade_texto.replace("menor", "").strip().upper()
-                resultado = theory_teacher.explain_harmonic_field(tonica, "minor")
-            else:
-                # Assume maior se não especificado
-                tonica = tonalidade_texto.strip().upper()
-                resultado = theory_teacher.explain_harmonic_field(tonica, "major")
-            
-            if "erro" in resultado:
-                return {"resposta": resultado["erro"]}
+# Tônica e qualidade logo após a palavra-chave, ex.: "campo harmônico de C maior". A tônica precisa
+# ser uma palavra inteira, para não pegar a inicial de "em" ou "blues"
+_TONICA = r"(?:(?:de|do|da|em)\s+)?(?P<tonica>[a-g][#b]?)(?![\wà-ú])\s*(?P<qualidade>maior|menor)?"
+CAMPO_HARMONICO_RE = re.compile(r"campo harmônico\s+" + _TONICA)
+ESCALA_RE = re.compile(r"escala\s+" + _TONICA)
+
+# Modelos das respostas; as listas são unidas por vírgula antes de formatar
+ESCALA_TMPL = "Escala de {escala}:\nNotas: {notas}\nPadrão: {padrao} (T=Tom, S=Semitom)\nDescrição: {descricao}"
+ACORDE_TMPL = "Acorde {acorde}:\nNotas: {notas}\nIntervalos: {intervalos}\nDescrição: {descricao}\nProgressão sugerida: {exemplo_progressao}"
+INTERVALO_TMPL = "Intervalo entre {nota1} e {nota2}:\nIntervalo: {intervalo} ({semitons} semitons)\nDescrição: {descricao}\nExemplo musical: {exemplo_musical}"
+MODO_TMPL = "Modo {modo}:\nNotas: {notas}\nCaracterística: {caracteristica}\nDescrição: {descricao}\nGêneros musicais: {generos_musicais}"
+CADENCIA_TMPL = "Cadência {cadencia}:\nProgressão: {progressao}\nDescrição: {descricao}\nFunção: {funcao}"
+FUNCAO_HARMONICA_TMPL = "Função Harmônica do grau {grau} no modo {modo}:\nNome: {nome}\nDescrição: {descricao}\nExemplos: {exemplos}"
+
+MODOS = frozenset({"jônio", "dórico", "frígio", "lídio", "mixolídio", "eólio", "lócrio"})
+
+def _tokenizar(texto: str) -> dict:
+    """Divide a pergunta em palavras uma única vez, já localizando notas e nome de modo."""
+    palavras = texto.split()
+    notas = []  # (posição da palavra, nota)
+    modo = None
+    for i, palavra in enumerate(palavras):
+        nota = palavra.upper()
+        if nota in NOTE_NAMES:
+            notas.append((i, nota))
+        # Comparação exata (sem pontuação): "mixolídio" não é confundido com "lídio"
+        nome = palavra.strip("?!.,;:")
+        if nome in MODOS:
+            modo = nome
+    return {"palavras": palavras, "notas": notas, "modo": modo}
+
+def _responder_campo_harmonico(texto: str, tokens: dict) -> dict:
+    match = CAMPO_HARMONICO_RE.search(texto)
+    if not match:
+        return {"resposta": "Especifique a tonalidade. Exemplo: 'campo harmônico de C maior'"}
+
+    tonica = match.group("tonica").capitalize()
+    # Assume maior se não especificado
+    modo = "minor" if match.group("qualidade") == "menor" else "major"
+    resultado = theory_teacher.explain_harmonic_field(tonica, modo)
+
+    if "erro" in resultado:
+        return {"resposta": resultado["erro"]}
+
+    partes = [f"Campo harmônico de {resultado['tonalidade']}:"]
+    partes.extend(f"{acorde['grau']} - {acorde['cifra']} ({acorde['funcao']})" for acorde in resultado["acordes"])
+    partes.append("")
+    partes.append("Progressões comuns:")
+    partes.extend(resultado["progressoes_comuns"])
+    return {"resposta": "\n".join(partes)}
+
+def _responder_escala(texto: str, tokens: dict) -> dict:
+    match = ESCALA_RE.search(texto)
+    if not match:
+        return {"resposta": "Especifique a tonalidade. Exemplo: 'escala de D maior'"}
+
+    tonica = match.group("tonica").capitalize()
+    modo = "minor" if match.group("qualidade") == "menor" else "major"
+    resultado = theory_teacher.explain_scale(tonica, modo)
+
+    if "erro" in resultado:
+        return {"resposta": resultado["erro"]}
+
+    resposta = ESCALA_TMPL.format_map({**resultado, "notas": ", ".join(resultado["notas"])})
+    return {"resposta": resposta}
+
+def _responder_formacao_acorde(texto: str, tokens: dict) -> dict:
+    # Usa a primeira nota encontrada como fundamental do acorde
+    if tokens["notas"]:
+        i, root = tokens["notas"][0]
+        palavras = tokens["palavras"]
+        # Verifica se há especificação de tipo
+        if i + 1 < len(palavras):
+            next_word = palavras[i + 1]
+            if "menor" in next_word or "m" == next_word:
+                chord_type = "minor"
+            elif "maior" in next_word or "M" == next_word:
+                chord_type = "major"
+            elif "7" in next_word:
+                chord_type = "7"
             else:
-                acordes_info = []
-                for acorde in resultado["acordes"]:
-                    acordes_info.append(f"{acorde["grau"]} - {acorde["cifra"]} ({acorde["funcao"]})")
-                
-                resposta = f"Campo harmônico de {resultado["tonalidade"]}:\n"
-                resposta += "\n".join(acordes_info)
-                resposta += f"\n\nProgressões comuns:\n" + "\n".join(resultado["progressoes_comuns"])
-                return {"resposta": resposta}
+                chord_type = "major"
         else:
-            return {"resposta": "Especifique a tonalidade. Exemplo: 'campo harmônico de C maior'"}
-
-    elif "escala de" in texto:
-        # Extrai a tonalidade da pergunta
-        partes = texto.split("escala de")
-        if len(partes) > 1:
-            tonalidade = partes[1].strip()
-            if "maior" in tonalidade:
-                tonica = tonalidade.replace("maior", "").strip().upper()
-                resultado = theory_teacher.explain_scale(tonica, "major")
-            elif "menor" in tonalidade:
-                tonica = tonalidade.replace("menor", "").strip().upper()
-                resultado = theory_teacher.explain_scale(tonica, "minor")
-            else:
-                tonica = tonalidade.strip().upper()
-                resultado = theory_teacher.explain_scale(tonica, "major")
-            
-            if "erro" in resultado:
-                return {"resposta": resultado["erro"]}
-            else:
-                resposta = f"Escala de {resultado["escala"]}:\n"
-                resposta += f"Notas: {', '.join(resultado['notas'])}\n"
-                resposta += f"Padrão: {resultado['padrao']} (T=Tom, S=Semitom)\n"
-                resposta += f"Descrição: {resultado['descricao']}"
-                return {"resposta": resposta}
-
-    elif "acorde" in texto and ("como formar" in texto or "como fazer" in texto or "formação" in texto):
-        # Tenta extrair o acorde específico
-        palavras = texto.split()
-        for i, palavra in enumerate(palavras):
-            if palavra.upper() in theory_teacher.note_names:
-                root = palavra.upper()
-                # Verifica se há especificação de tipo
-                if i + 1 < len(palavras):
-                    next_word = palavras[i + 1]
-                    if "menor" in next_word or "m" == next_word:
-                        chord_type = "minor"
-                    elif "maior" in next_word or "M" == next_word:
-                        chord_type = "major"
-                    elif "7" in next_word:
-                        chord_type = "7"
-                    else:
-                        chord_type = "major"
-                else:
-                    chord_type = "major"
-                
-                resultado = theory_teacher.explain_chord(root, chord_type)
-                if "erro" in resultado:
-                    return {"resposta": resultado["erro"]}
-                else:
-                    resposta = f"Acorde {resultado["acorde"]}:\n"
-                    resposta += f"Notas: {', '.join(resultado['notas'])}\n"
-                    resposta += f"Intervalos: {', '.join(resultado['intervalos'])}\n"
-                    resposta += f"Descrição: {resultado['descricao']}\n"
-                    resposta += f"Progressão sugerida: {resultado['exemplo_progressao']}"
-                    return {"resposta": resposta}
-                break
-        
-        return {"resposta": "Para formar acordes básicos: Acorde maior = 1ª + 3ª maior + 5ª justa. Acorde menor = 1ª + 3ª menor + 5ª justa. Especifique um acorde para análise detalhada."}
-
-    elif "intervalo" in texto and ("entre" in texto or "de" in texto):
-        # Tenta extrair as duas notas
-        palavras = texto.split()
-        notas_encontradas = []
-        for palavra in palavras:
-            if palavra.upper() in theory_teacher.note_names:
-                notas_encontradas.append(palavra.upper())
-        
-        if len(notas_encontradas) >= 2:
-            resultado = theory_teacher.explain_interval(notas_encontradas[0], notas_encontradas[1])
-            if "erro" in resultado:
-                return {"resposta": resultado["erro"]}
-            else:
-                resposta = f"Intervalo entre {resultado["nota1"]} e {resultado["nota2"]}:\n"
-                resposta += f"Intervalo: {resultado['intervalo']} ({resultado['semitons']} semitons)\n"
-                resposta += f"Descrição: {resultado['descricao']}\n"
-                resposta += f"Exemplo musical: {resultado['exemplo_musical']}"
-                return {"resposta": resposta}
+            chord_type = "major"
+
+        resultado = theory_teacher.explain_chord(root, chord_type)
+        if "erro" in resultado:
+            return {"resposta": resultado["erro"]}
         else:
-            return {"resposta": "Especifique duas notas para calcular o intervalo. Exemplo: 'intervalo entre C e E'"}
+            resposta = ACORDE_TMPL.format_map({**resultado, "notas": ", ".join(resultado["notas"]), "intervalos": ", ".join(resultado["intervalos"])})
+            return {"resposta": resposta}
 
-    elif "modo" in texto and any(modo in texto for modo in ["jônio", "dórico", "frígio", "lídio", "mixolídio", "eólio", "lócrio"]):
-        # Extrai o modo e a tônica
-        palavras = texto.split()
-        tonica = None
-        modo = None
-        
-        for palavra in palavras:
-            if palavra.upper() in theory_teacher.note_names:
-                tonica = palavra.upper()
-            for modo_nome in ["jônio", "dórico", "frígio", "lídio", "mixolídio", "eólio", "lócrio"]:
-                if modo_nome in palavra.lower():
-                    modo = modo_nome
-                    break
-        
-        if tonica and modo:
-            resultado = theory_teacher.explain_mode(tonica, modo)
-            if "erro" in resultado:
-                return {"resposta": resultado["erro"]}
-            else:
-                resposta = f"Modo {resultado["modo"]}:\n"
-                resposta += f"Notas: {', '.join(resultado['notas'])}\n"
-                resposta += f"Característica: {resultado['caracteristica']}\n"
-                resposta += f"Descrição: {resultado['descricao']}\n"
-                resposta += f"Gêneros musicais: {', '.join(resultado['generos_musicais'])}"
-                return {"resposta": resposta}
+    return {"resposta": "Para formar acordes básicos: Acorde maior = 1ª + 3ª maior + 5ª justa. Acorde menor = 1ª + 3ª menor + 5ª justa. Especifique um acorde para análise detalhada."}
+
+def _responder_intervalo(texto: str, tokens: dict) -> dict:
+    # Usa as duas primeiras notas encontradas
+    notas_encontradas = [nota for _, nota in tokens["notas"]]
+
+    if len(notas_encontradas) >= 2:
+        resultado = theory_teacher.explain_interval(notas_encontradas[0], notas_encontradas[1])
+        if "erro" in resultado:
+            return {"resposta": resultado["erro"]}
         else:
-            return {"resposta": "Especifique a tônica e o modo. Exemplo: 'modo C jônio' ou 'D dórico'"}
-
-    elif "cadência" in texto:
-        partes = texto.split("cadência")
-        if len(partes) > 1:
-            cadence_type = partes[1].strip()
-            resultado = theory_teacher.explain_cadence(cadence_type)
-            if "erro" in resultado:
-                return {"resposta": resultado["erro"]}
-            else:
-                resposta = f"Cadência {resultado["cadencia"]}:\n"
-                resposta += f"Progressão: {resultado['progressao']}\n"
-                resposta += f"Descrição: {resultado['descricao']}\n"
-                resposta += f"Função: {resultado['funcao']}"
-                return {"resposta": resposta}
+            resposta = INTERVALO_TMPL.format_map(resultado)
+            return {"resposta": resposta}
+    else:
+        return {"resposta": "Especifique duas notas para calcular o intervalo. Exemplo: 'intervalo entre C e E'"}
+
+def _responder_modo(texto: str, tokens: dict) -> dict:
+    # A tônica é a última nota citada; o modo, o último nome de modo
+    tonica = tokens["notas"][-1][1] if tokens["notas"] else None
+    modo = tokens["modo"]
+
+    if tonica and modo:
+        resultado = theory_teacher.explain_mode(tonica, modo)
+        if "erro" in resultado:
+            return {"resposta": resultado["erro"]}
         else:
-            return {"resposta": "Especifique o tipo de cadência. Exemplo: 'cadência autêntica perfeita'"}
-
-    elif "função harmônica" in texto:
-        partes = texto.split("função harmônica")
-        if len(partes) > 1:
-            info = partes[1].strip().split("na tonalidade")
-            if len(info) == 2:
-                degree = info[0].strip()
-                mode = info[1].strip()
-                resultado = theory_teacher.explain_harmonic_function(degree, mode)
-                if "erro" in resultado:
-                    return {"resposta": resultado["erro"]}
-                else:
-                    resposta = f"Função Harmônica do grau {resultado["grau"]} no modo {resultado["modo"]}:\n"
-                    resposta += f"Nome: {resultado['nome']}\n"
-                    resposta += f"Descrição: {resultado['descricao']}\n"
-                    resposta += f"Exemplos: {', '.join(resultado['exemplos'])}"
-                    return {"resposta": resposta}
-            else:
-                return {"resposta": "Especifique o grau e a tonalidade. Exemplo: 'função harmônica I na tonalidade maior'"}
+            resposta = MODO_TMPL.format_map({**resultado, "notas": ", ".join(resultado["notas"]), "generos_musicais": ", ".join(resultado["generos_musicais"])})
+            return {"resposta": resposta}
+    else:
+        return {"resposta": "Especifique a tônica e o modo. Exemplo: 'modo C jônio' ou 'D dórico'"}
 
-    elif "exercício" in texto or "exercicio" in texto:
-        return {"resposta": "Posso gerar exercícios de teoria musical! Use os botões na interface para gerar exercícios de intervalos, acordes ou escalas. Isso ajudará você a praticar e fixar o conhecimento."}
+def _responder_cadencia(texto: str, tokens: dict) -> dict:
+    cadence_type = texto.partition("cadência")[2].strip()
+    resultado = theory_teacher.explain_cadence(cadence_type)
+    if "erro" in resultado:
+        return {"resposta": resultado["erro"]}
+    else:
+        resposta = CADENCIA_TMPL.format_map(resultado)
+        return {"resposta": resposta}
 
+def _responder_funcao_harmonica(texto: str, tokens: dict) -> dict:
+    info = texto.partition("função harmônica")[2].strip().split("na tonalidade")
+    if len(info) == 2:
+        degree = info[0].strip()
+        mode = info[1].strip()
+        resultado = theory_teacher.explain_harmonic_function(degree, mode)
+        if "erro" in resultado:
+            return {"resposta": resultado["erro"]}
+        else:
+            resposta = FUNCAO_HARMONICA_TMPL.format_map({**resultado, "exemplos": ", ".join(resultado["exemplos"])})
+            return {"resposta": resposta}
     else:
-        return {"resposta": "Ainda não sei responder essa pergunta, mas estou aprendendo! 🎵 Você pode perguntar sobre escalas, acordes, campo harmônico, intervalos, modos gregos, ou enviar um arquivo de áudio para análise. Também posso gerar exercícios para você praticar!"}
+        return {"resposta": "Especifique o grau e a tonalidade. Exemplo: 'função harmônica I na tonalidade maior'"}
+
+def _responder_exercicio(texto: str, tokens: dict) -> dict:
+    return {"resposta": "Posso gerar exercícios de teoria musical! Use os botões na interface para gerar exercícios de intervalos, acordes ou escalas. Isso ajudará você a praticar e fixar o conhecimento."}
+
+# Palavras-chave exigidas por cada tipo de pergunta, em ordem de prioridade, e se o
+# handler pode chamar o music21 (lento o bastante para ir a uma thread fora do event loop).
+# Só a escala ainda pode: tônicas fora da tabela (bemóis) caem no music21
+INTENCOES = [
+    (frozenset({"campo"}), _responder_campo_harmonico, False),
+    (frozenset({"escala"}), _responder_escala, True),
+    (frozenset({"acorde", "formar"}), _responder_formacao_acorde, False),
+    (frozenset({"intervalo", "entre"}), _responder_intervalo, False),
+    (frozenset({"modo", "nome_modo"}), _responder_modo, False),
+    (frozenset({"cadencia"}), _responder_cadencia, False),
+    (frozenset({"funcao"}), _responder_funcao_harmonica, False),
+    (frozenset({"exercicio"}), _responder_exercicio, False),
+]
+
+@app.post("/perguntar")
+async def perguntar(pergunta: Pergunta):
+    texto = pergunta.texto.lower()
+
+    # Respostas sobre teoria musical usando o sistema de ensino
+    encontradas = {match.lastgroup for match in INTENT_RE.finditer(texto)}
+    for exigidas, responder, usa_music21 in INTENCOES:
+        if exigidas <= encontradas:
+            if usa_music21:
+                return await asyncio.to_thread(responder, texto, _tokenizar(texto))
+            return responder(texto, _tokenizar(texto))
+
+    return {"resposta": "Ainda não sei responder essa pergunta, mas estou aprendendo! 🎵 Você pode perguntar sobre escalas, acordes, campo harmônico, intervalos, modos gregos, ou enviar um arquivo de áudio para análise. Também posso gerar exercícios para você praticar!"}
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
+    # Com mais de um worker o uvicorn exige o app como string de importação ("main:app").
+    # loop/http "auto" escolhem uvloop e httptools quando instalados (uvicorn[standard]).
+    uvicorn.run(
+        "main:app",
+        host="0.0.0.0",
+        port=8000,
+        loop="auto",
+        http="auto",
+        workers=int(os.getenv("WEB_CONCURRENCY", os.cpu_count() or 1)),
+    )
\ No newline at end of file
@@ -1,363 +1,539 @@
-import music21 as m21
-from typing import List, Dict, Tuple
+import re
+from functools import lru_cache
+from types import MappingProxyType
+from typing import List, Dict, NamedTuple, Tuple
 import random
 
+_RNG = random.Random()
+
+# music21 é pesado e só é usado em explain_scale (tônicas fora da tabela): importado na primeira chamada
+_M21 = None
+
+def _m21():
+    """Importa o music21 sob demanda e reaproveita o módulo nas chamadas seguintes."""
+    global _M21
+    if _M21 is None:
+        import music21
+        _M21 = music21
+    return _M21
+
+# Notas, intervalos e modos (tabelas fixas, compartilhadas por todas as instâncias)
+_NOTE_NAMES = ('C', 'C#', 'D', 'D#', 'E', 'F', 'F#', 'G', 'G#', 'A', 'A#', 'B')
+# Bemóis aceitos como entrada (já em maiúsculas, como chegam de note.upper()) -> índice da nota
+_FLAT_NAMES = MappingProxyType({"DB": 1, "EB": 3, "GB": 6, "AB": 8, "BB": 10})
+# Índice de cada nota para busca O(1) (em vez de list.index), incluindo as grafias com bemol
+_NOTE_INDEX = MappingProxyType({**{note: i for i, note in enumerate(_NOTE_NAMES)}, **_FLAT_NAMES})
+# Grafia com bemóis, usada nas tabelas de notas quando a tônica chega com bemol
+_FLAT_SPELLING = ('C', 'Db', 'D', 'Eb', 'E', 'F', 'Gb', 'G', 'Ab', 'A', 'Bb', 'B')
+
+def _pitch_names(tonic: str) -> Tuple[str, ...]:
+    """Nomes das 12 notas na grafia da tônica (já em maiúsculas): bemóis para BB, EB..., sustenidos para as demais."""
+    return _FLAT_SPELLING if tonic in _FLAT_NAMES else _NOTE_NAMES
+
+def _unknown_note(note: str) -> Dict:
+    """Resposta de erro para nota inexistente (mesma mensagem do ValueError de note_index)."""
+    return {"erro": f"'{note.upper()}' is not in list"}
+
+_INTERVAL_NAMES = MappingProxyType({
+    0: "Uníssono",
+    1: "2ª menor",
+    2: "2ª maior",
+    3: "3ª menor",
+    4: "3ª maior",
+    5: "4ª justa",
+    6: "Trítono",
+    7: "5ª justa",
+    8: "6ª menor",
+    9: "6ª maior",
+    10: "7ª menor",
+    11: "7ª maior",
+    12: "Oitava"
+})
+
+_MODES = MappingProxyType({
+    "jônio": (0, 2, 4, 5, 7, 9, 11),
+    "dórico": (0, 2, 3, 5, 7, 9, 10),
+    "frígio": (0, 1, 3, 5, 7, 8, 10),
+    "lídio": (0, 2, 4, 6, 7, 9, 11),
+    "mixolídio": (0, 2, 4, 5, 7, 9, 10),
+    "eólio": (0, 2, 3, 5, 7, 8, 10),
+    "lócrio": (0, 1, 3, 5, 6, 8, 10),
+    "pentatônica maior": (0, 2, 4, 7, 9),
+    "pentatônica menor": (0, 3, 5, 7, 10),
+    "blues": (0, 3, 5, 6, 7, 10)
+})
+
+# Nome aceito (em minúsculas) para maior/menor -> chave canônica usada nas tabelas
+_MODE_NORM = MappingProxyType({"major": "major", "maior": "major", "minor": "minor", "menor": "minor"})
+
+# Padrão e descrição de cada escala (explain_scale)
+_SCALE_INFO = MappingProxyType({
+    "major": ("T-T-S-T-T-T-S", "A escala maior tem um som alegre e brilhante."),
+    "minor": ("T-S-T-T-S-T-T", "A escala menor natural tem um som melancólico e introspectivo.")
+})
+
+# Qualidade das tríades de cada grau e descrição de cada campo harmônico (explain_harmonic_field)
+_FIELD_QUALITIES = MappingProxyType({
+    "major": ("", "m", "m", "", "", "m", "dim"),
+    "minor": ("m", "dim", "", "m", "m", "", "")
+})
+_FIELD_DESCRIPTIONS = MappingProxyType({
+    "major": "Campo harmônico maior: base para a maioria das progressões na música ocidental.",
+    "minor": "Campo harmônico menor: oferece sonoridades mais melancólicas e dramáticas."
+})
+
+_CHORD_INTERVALS = MappingProxyType({"major": (0, 4, 7), "minor": (0, 3, 7), "7": (0, 4, 7, 10)})
+
+# Nome do tipo de acorde (já em minúsculas) -> (tipo canônico, descrição)
+_MAJOR_CHORD = ("major", "Acorde maior: som alegre e estável. Formado por 1ª + 3ª maior + 5ª justa.")
+_MINOR_CHORD = ("minor", "Acorde menor: som melancólico e introspectivo. Formado por 1ª + 3ª menor + 5ª justa.")
+_DOMINANT7_CHORD = ("7", "Acorde de 7ª dominante: cria tensão que resolve no acorde seguinte.")
+_CHORD_ALIASES = MappingProxyType({
+    "major": _MAJOR_CHORD, "maior": _MAJOR_CHORD,
+    "minor": _MINOR_CHORD, "menor": _MINOR_CHORD, "m": _MINOR_CHORD,
+    "7": _DOMINANT7_CHORD, "dominant7": _DOMINANT7_CHORD, "dominante": _DOMINANT7_CHORD
+})
+
+# Tabelas de notas pré-calculadas: (tônica, modo) e (fundamental, tipo de acorde), para todas as
+# grafias de _NOTE_INDEX; tônicas com bemol mantêm a grafia com bemóis (BB dórico -> Bb, C, Db...)
+_MODE_NOTES = MappingProxyType({
+    (tonic, mode): [_pitch_names(tonic)[(root_idx + i) % 12] for i in intervals]
+    for tonic, root_idx in _NOTE_INDEX.items()
+    for mode, intervals in _MODES.items()
+})
+_CHORD_NOTES = MappingProxyType({
+    (root, chord_type): [_pitch_names(root)[(root_idx + i) % 12] for i in intervals]
+    for root, root_idx in _NOTE_INDEX.items()
+    for chord_type, intervals in _CHORD_INTERVALS.items()
+})
+
+# Escalas maior e menor natural de cada tônica, soletradas como o music21 (tônica4 até tônica8)
+_LETTERS = "CDEFGAB"
+_NATURAL_PCS = (0, 2, 4, 5, 7, 9, 11)
+
+def _spell_scale(tonic: str, intervals: Tuple[int, ...]) -> List[str]:
+    """Soletra quatro oitavas da escala: uma letra por grau, acidente pela diferença de semitons."""
+    letter0 = _LETTERS.index(tonic[0])
+    tonic_pc = _NOTE_INDEX[tonic]
+    notes = []
+    for k in range(4 * len(intervals) + 1):
+        letter = letter0 + k
+        accidental = (tonic_pc + intervals[k % 7] - _NATURAL_PCS[letter % 7] + 6) % 12 - 6
+        name = _LETTERS[letter % 7] + ("#" * accidental if accidental > 0 else "-" * -accidental)
+        notes.append(f"{name}{4 + letter // 7}")
+    return notes
+
+_SCALE_TABLE = MappingProxyType({
+    (tonic, scale_type): _spell_scale(tonic, _MODES[mode])
+    for tonic in _NOTE_NAMES
+    for scale_type, mode in (("major", "jônio"), ("minor", "eólio"))
+})
+
+# Fundamentais dos sete graus do campo harmônico maior/menor de cada tônica (com sustenido ou
+# bemol, como em _NOTE_INDEX), soletradas grau a grau e cifradas com "b" para bemol: F -> Bb, C# -> E#
+_FIELD_ROOTS = MappingProxyType({
+    (tonic, field): tuple(note[:-1].replace("-", "b") for note in _spell_scale(tonic, _MODES[mode])[:7])
+    for tonic in _NOTE_INDEX
+    for field, mode in (("major", "jônio"), ("minor", "eólio"))
+})
+
+# Nome da tríade (como o commonName do music21) pela qualidade usada na cifra
+_TRIAD_NAMES = MappingProxyType({"": "major triad", "m": "minor triad", "dim": "diminished triad"})
+
+# Progressões comuns do campo harmônico maior e menor
+_COMMON_PROGRESSIONS = MappingProxyType({
+    "major": ["I - IV - V - I", "I - V - vi - IV", "ii - V - I", "I - vi - IV - V"],
+    "minor": ["i - iv - v - i", "i - VI - III - VII", "i - iv - V - i", "ii° - V - i"]
+})
+
+# Cadências harmônicas expandidas
+_CADENCES = MappingProxyType({
+    "autêntica perfeita": {
+        "progressao": "V - I",
+        "descricao": "A cadência autêntica perfeita é a mais forte e conclusiva.",
+        "funcao": "Conclusiva, forte senso de repouso.",
+        "exemplos": ["G - C em C maior", "E - Am em A menor"]
+    },
+    "plagal": {
+        "progressao": "IV - I",
+        "descricao": "Conhecida como 'Amém' cadência, é menos conclusiva que a autêntica.",
+        "funcao": "Conclusiva, mas suave e menos final.",
+        "exemplos": ["F - C em C maior", "D - A em A maior"]
+    },
+    "deceptiva": {
+        "progressao": "V - vi (ou VI)",
+        "descricao": "O acorde de dominante não resolve na tônica, criando surpresa.",
+        "funcao": "Evita a conclusão esperada, cria surpresa.",
+        "exemplos": ["G - Am em C maior", "E - F em A menor"]
+    }
+})
+
+# Tabelas de texto fixas, criadas uma única vez (somente leitura)
+_INTERVAL_DESCRIPTIONS = MappingProxyType({
+    0: "Mesmo som, sem diferença de altura.",
+    1: "Intervalo muito dissonante, cria tensão.",
+    2: "Intervalo consonante, som suave.",
+    3: "Característico de acordes menores, som melancólico.",
+    4: "Característico de acordes maiores, som alegre.",
+    5: "Intervalo muito estável, base da harmonia.",
+    6: "Intervalo muito dissonante, divide a oitava ao meio.",
+    7: "Intervalo perfeito, muito consonante.",
+    8: "Intervalo suave, usado em melodias.",
+    9: "Intervalo brilhante, usado em acordes maiores.",
+    10: "Usado em acordes de 7ª, cria tensão moderada.",
+    11: "Intervalo muito consonante, usado em acordes sofisticados.",
+    12: "Repetição da nota fundamental uma oitava acima."
+})
+
+_INTERVAL_EXAMPLES = MappingProxyType({
+    0: "Duas vozes cantando a mesma nota",
+    1: "Tema do filme 'Tubarão'",
+    2: "Início de 'Frère Jacques'",
+    3: "Início de 'Greensleeves'",
+    4: "Início de 'When the Saints Go Marching In'",
+    5: "Início de 'Here Comes the Bride'",
+    6: "Abertura de 'West Side Story' (Maria)",
+    7: "Início de 'Twinkle, Twinkle, Little Star'",
+    8: "Tema de 'The Way You Look Tonight'",
+    9: "Início de 'My Bonnie Lies Over the Ocean'",
+    10: "Acorde dominante em 'Happy Birthday'",
+    11: "Início de 'Take On Me' (a-ha)",
+    12: "Início de 'Somewhere Over the Rainbow'"
+})
+
+class _IntervalInfo(NamedTuple):
+    """Dados fixos de um intervalo."""
+    name: str
+    description: str
+    example: str
+
+# Nome, descrição e exemplo de cada intervalo numa só consulta, indexados pelos semitons (0-12)
+_INTERVAL_FACTS = tuple(
+    _IntervalInfo(_INTERVAL_NAMES[i], _INTERVAL_DESCRIPTIONS[i], _INTERVAL_EXAMPLES[i]) for i in range(13)
+)
+
+_MODE_DESCRIPTIONS = MappingProxyType({
+    "jônio": "Modo maior tradicional, alegre e estável.",
+    "dórico": "Modo menor com 6ª maior, usado no jazz e folk.",
+    "frígio": "Modo menor com 2ª menor, som espanhol/flamenco.",
+    "lídio": "Modo maior com 4ª aumentada, som etéreo.",
+    "mixolídio": "Modo maior com 7ª menor, usado no rock e blues.",
+    "eólio": "Modo menor natural, melancólico.",
+    "lócrio": "Modo com 5ª diminuta, muito instável."
+})
+
+_MODE_GENRES = MappingProxyType({
+    "jônio": ["Pop", "Rock", "Clássica"],
+    "dórico": ["Jazz", "Folk", "Rock progressivo"],
+    "frígio": ["Flamenco", "Metal", "Música espanhola"],
+    "lídio": ["Jazz fusion", "Trilhas sonoras", "Música new age"],
+    "mixolídio": ["Blues", "Rock", "Country"],
+    "eólio": ["Rock", "Pop", "Folk"],
+    "lócrio": ["Jazz", "Metal extremo", "Música experimental"]
+})
+
+_MODE_CHARACTERISTICS = MappingProxyType({
+    "jônio": "3ª e 7ª maiores",
+    "dórico": "3ª menor, 6ª maior",
+    "frígio": "2ª menor, 3ª menor",
+    "lídio": "4ª aumentada",
+    "mixolídio": "3ª maior, 7ª menor",
+    "eólio": "3ª menor, 6ª menor, 7ª menor",
+    "lócrio": "2ª menor, 5ª diminuta"
+})
+
+# Tudo o que explain_mode precisa de cada modo numa só consulta: (característica, descrição, gêneros)
+_MODE_INFO = MappingProxyType({
+    mode: (
+        _MODE_CHARACTERISTICS.get(mode, "Característica não definida."),
+        _MODE_DESCRIPTIONS.get(mode, "Descrição não disponível."),
+        _MODE_GENRES.get(mode, [])
+    )
+    for mode in _MODES
+})
+
+# Respostas de explain_cadence já montadas, uma por cadência
+_CADENCE_RESPONSES = MappingProxyType({
+    key: {"cadencia": key, "progressao": info["progressao"], "descricao": info["descricao"], "funcao": info["funcao"]}
+    for key, info in _CADENCES.items()
+})
+
+# Remove acentos (o texto já vem em minúsculas) para casar palavras-chave com ou sem acento
+_STRIP_ACCENTS = str.maketrans("áàâãéêíóôõúç", "aaaaeeiooouc")
+
+# Palavras-chave de cada cadência (sem acento) -> chave em _CADENCES
+_CADENCE_KEYS = MappingProxyType({
+    "autentica": "autêntica perfeita",
+    "plagal": "plagal",
+    "deceptiva": "deceptiva"
+})
+_CADENCE_RE = re.compile("(" + "|".join(_CADENCE_KEYS) + ")")
+
+# Função de cada grau no campo harmônico (explain_harmonic_field)
+_MAJOR_CHORD_FUNCTIONS = MappingProxyType({
+    1: "Tônica (repouso)",
+    2: "Subdominante (preparação)",
+    3: "Tônica relativa",
+    4: "Subdominante (afastamento)",
+    5: "Dominante (tensão)",
+    6: "Superdominante (tônica relativa)",
+    7: "Meio diminuto (Tensão)"
+})
+
+_MINOR_CHORD_FUNCTIONS = MappingProxyType({
+    1: "Tônica (repouso)",
+    2: "Subdominante (preparação)",
+    3: "Tônica relativa",
+    4: "Subdominante (afastamento)",
+    5: "Dominante (tensão)",
+    6: "Superdominante (subdominante relativa)",
+    7: "Subtônica (dominante relativa)"
+})
+
+# Dados fixos de cada grau do campo harmônico, já combinados: (numeral, qualidade, tríade, função)
+_FIELD_DEGREES = MappingProxyType({
+    field: tuple(
+        (roman, quality, _TRIAD_NAMES[quality], functions[degree])
+        for degree, (roman, quality) in enumerate(
+            zip(("I", "II", "III", "IV", "V", "VI", "VII"), _FIELD_QUALITIES[field]), start=1
+        )
+    )
+    for field, functions in (("major", _MAJOR_CHORD_FUNCTIONS), ("minor", _MINOR_CHORD_FUNCTIONS))
+})
+
+# Numerais romanos dos graus (maiúsculos e minúsculos)
+_ROMAN_MAP = MappingProxyType({
+    'I': 1, 'II': 2, 'III': 3, 'IV': 4, 'V': 5, 'VI': 6, 'VII': 7,
+    'i': 1, 'ii': 2, 'iii': 3, 'iv': 4, 'v': 5, 'vi': 6, 'vii': 7
+})
+
+# Funções harmônicas por grau (explain_harmonic_function)
+_MAJOR_FUNCTIONS = MappingProxyType({
+    1: {"nome": "Tônica", "descricao": "Centro tonal, repouso", "exemplos": ["C em C maior"]},
+    2: {"nome": "Supertônica", "descricao": "Preparação subdominante", "exemplos": ["Dm em C maior"]},
+    3: {"nome": "Mediante", "descricao": "Tônica relativa", "exemplos": ["Em em C maior"]},
+    4: {"nome": "Subdominante", "descricao": "Afastamento da tônica", "exemplos": ["F em C maior"]},
+    5: {"nome": "Dominante", "descricao": "Tensão máxima", "exemplos": ["G em C maior"]},
+    6: {"nome": "Superdominante", "descricao": "Tônica relativa", "exemplos": ["Am em C maior"]},
+    7: {"nome": "Sensível", "descricao": "Tensão dominante", "exemplos": ["Bdim em C maior"]}
+})
+
+_MINOR_FUNCTIONS = MappingProxyType({
+    1: {"nome": "Tônica", "descricao": "Centro tonal, repouso", "exemplos": ["Am em A menor"]},
+    2: {"nome": "Supertônica", "descricao": "Preparação subdominante", "exemplos": ["Bdim em A menor"]},
+    3: {"nome": "Mediante", "descricao": "Dominante relativa", "exemplos": ["C em A menor"]},
+    4: {"nome": "Subdominante", "descricao": "Afastamento da tônica", "exemplos": ["Dm em A menor"]},
+    5: {"nome": "Dominante", "descricao": "Tensão máxima", "exemplos": ["Em em A menor"]},
+    6: {"nome": "Superdominante", "descricao": "Subdominante relativa", "exemplos": ["F em A menor"]},
+    7: {"nome": "Subtônica", "descricao": "Dominante relativa", "exemplos": ["G em A menor"]}
+})
+
 class MusicTheoryTeacher:
     """Classe para ensino avançado de teoria musical."""
     
-    def __init__(self):
-        self.note_names = ['C', 'C#', 'D', 'D#', 'E', 'F', 'F#', 'G', 'G#', 'A', 'A#', 'B']
-        self.intervals = {
-            0: "Uníssono",
-            1: "2ª menor",
-            2: "2ª maior", 
-            3: "3ª menor",
-            4: "3ª maior",
-            5: "4ª justa",
-            6: "Trítono",
-            7: "5ª justa",
-            8: "6ª menor",
-            9: "6ª maior",
-            10: "7ª menor",
-            11: "7ª maior",
-            12: "Oitava"
-        }
+    # Sem atributos de instância: tudo vem das tabelas da classe e do módulo
+    __slots__ = ()
+    
+    # Tabelas compartilhadas (somente leitura); a instância não guarda estado próprio
+    note_names = _NOTE_NAMES
+    intervals = _INTERVAL_NAMES
+    modes = _MODES
+    cadences = _CADENCES
+    
+    def note_index(self, note: str) -> int:
+        """Retorna o índice (0-11) de uma nota; ValueError se a nota não existir."""
+        try:
+            return _NOTE_INDEX[note.upper()]
+        except KeyError:
+            raise ValueError(f"'{note.upper()}' is not in list") from None
+    
+    @lru_cache(maxsize=256)
+    def explain_scale(self, tonic: str, scale_type: str = "major") -> Dict:
+        """Explica uma escala musical com análise detalhada (resultado em cache; não modificar)."""
+        canonical = _MODE_NORM.get(scale_type.lower())
+        if canonical is None:
+            return {"erro": "Tipo de escala não reconhecido. Use 'maior' ou 'menor'."}
+        pattern, description = _SCALE_INFO[canonical]
         
-        self.modes = {
-            "jônio": [0, 2, 4, 5, 7, 9, 11],
-            "dórico": [0, 2, 3, 5, 7, 9, 10],
-            "frígio": [0, 1, 3, 5, 7, 8, 10],
-            "lídio": [0, 2, 4, 6, 7, 9, 11],
-            "mixolídio": [0, 2, 4, 5, 7, 9, 10],
-            "eólio": [0, 2, 3, 5, 7, 8, 10],
-            "lócrio": [0, 1, 3, 5, 6, 8, 10],
-            "pentatônica maior": [0, 2, 4, 7, 9],
-            "pentatônica menor": [0, 3, 5, 7, 10],
-            "blues": [0, 3, 5, 6, 7, 10]
-        }
+        notes = _SCALE_TABLE.get((tonic.upper(), canonical))
+        if notes is None:
+            # Tônicas fora da tabela (bemóis, grafias alternativas) ficam com o music21,
+            # que também é quem rejeita tônicas inválidas
+            try:
+                scale_class = _m21().scale.MajorScale if canonical == "major" else _m21().scale.MinorScale
+                notes = [str(p) for p in scale_class(tonic).getPitches(tonic, tonic + '8')]
+            except Exception as e:
+                return {"erro": str(e)}
         
-        # Cadências harmônicas expandidas
-        self.cadences = {
-            "autêntica perfeita": {
-                "progressao": "V - I",
-                "descricao": "A cadência autêntica perfeita é a mais forte e conclusiva.",
-                "funcao": "Conclusiva, forte senso de repouso.",
-                "exemplos": ["G - C em C maior", "E - Am em A menor"]
-            },
-            "plagal": {
-                "progressao": "IV - I",
-                "descricao": "Conhecida como 'Amém' cadência, é menos conclusiva que a autêntica.",
-                "funcao": "Conclusiva, mas suave e menos final.",
-                "exemplos": ["F - C em C maior", "D - A em A maior"]
-            },
-            "deceptiva": {
-                "progressao": "V - vi (ou VI)",
-                "descricao": "O acorde de dominante não resolve na tônica, criando surpresa.",
-                "funcao": "Evita a conclusão esperada, cria surpresa.",
-                "exemplos": ["G - Am em C maior", "E - F em A menor"]
-            }
+        return {
+            "escala": f"{tonic} {scale_type}",
+            "notas": notes,
+            "padrao": pattern,
+            "descricao": description
         }
     
-    def explain_scale(self, tonic: str, scale_type: str = "major") -> Dict:
-        """Explica uma escala musical com análise detalhada."""
-        try:
-            if scale_type.lower() == "major" or scale_type.lower() == "maior":
-                scale = m21.scale.MajorScale(tonic)
-                pattern = "T-T-S-T-T-T-S"
-                description = "A escala maior tem um som alegre e brilhante."
-            elif scale_type.lower() == "minor" or scale_type.lower() == "menor":
-                scale = m21.scale.MinorScale(tonic)
-                pattern = "T-S-T-T-S-T-T"
-                description = "A escala menor natural tem um som melancólico e introspectivo."
-            else:
-                return {"erro": "Tipo de escala não reconhecido. Use 'maior' ou 'menor'."}
-            
-            notes = [str(p) for p in scale.getPitches(tonic, tonic + '8')]
-            
-            return {
-                "escala": f"{tonic} {scale_type}",
-                "notas": notes,
-                "padrao": pattern,
-                "descricao": description
-            }
-            
-        except Exception as e:
-            return {"erro": str(e)}
-    
+    @lru_cache(maxsize=256)
     def explain_chord(self, root: str, chord_type: str = "major") -> Dict:
-        """Explica a formação de um acorde com análise detalhada."""
-        try:
-            root_idx = self.note_names.index(root.upper())
-            
-            if chord_type.lower() in ["major", "maior", "M"]:
-                intervals = [0, 4, 7]
-                chord_notes = [self.note_names[(root_idx + i) % 12] for i in intervals]
-                description = "Acorde maior: som alegre e estável. Formado por 1ª + 3ª maior + 5ª justa."
-                
-            elif chord_type.lower() in ["minor", "menor", "m"]:
-                intervals = [0, 3, 7]
-                chord_notes = [self.note_names[(root_idx + i) % 12] for i in intervals]
-                description = "Acorde menor: som melancólico e introspectivo. Formado por 1ª + 3ª menor + 5ª justa."
-                
-            elif chord_type.lower() in ["7", "dominant7", "dominante"]:
-                intervals = [0, 4, 7, 10]
-                chord_notes = [self.note_names[(root_idx + i) % 12] for i in intervals]
-                description = "Acorde de 7ª dominante: cria tensão que resolve no acorde seguinte."
-            else:
-                return {"erro": "Tipo de acorde não reconhecido."}
-            
-            interval_names = [self.intervals[i] for i in intervals]
-            
-            return {
-                "acorde": f"{root.upper()}{chord_type}",
-                "notas": chord_notes,
-                "intervalos": interval_names,
-                "descricao": description,
-                "exemplo_progressao": self.suggest_chord_progression(root.upper(), chord_type)
-            }
-            
-        except Exception as e:
-            return {"erro": str(e)}
+        """Explica a formação de um acorde com análise detalhada (resultado em cache; não modificar)."""
+        root_upper = root.upper()
+        if root_upper not in _NOTE_INDEX:
+            return _unknown_note(root)
+        
+        alias = _CHORD_ALIASES.get(chord_type.lower())
+        if alias is None:
+            return {"erro": "Tipo de acorde não reconhecido."}
+        canonical, description = alias
+        
+        intervals = _CHORD_INTERVALS[canonical]
+        chord_notes = _CHORD_NOTES[(root_upper, canonical)]
+        interval_names = [self.intervals[i] for i in intervals]
+        
+        return {
+            "acorde": f"{root_upper.capitalize()}{chord_type}",
+            "notas": chord_notes,
+            "intervalos": interval_names,
+            "descricao": description,
+            "exemplo_progressao": self.suggest_chord_progression(root_upper, canonical)
+        }
     
+    @lru_cache(maxsize=256)
     def explain_interval(self, note1: str, note2: str) -> Dict:
-        """Explica o intervalo entre duas notas."""
-        try:
-            idx1 = self.note_names.index(note1.upper())
-            idx2 = self.note_names.index(note2.upper())
-            
-            # Calcula o intervalo ascendente
-            interval = (idx2 - idx1) % 12
-            
-            return {
-                "nota1": note1.upper(),
-                "nota2": note2.upper(),
-                "intervalo": self.intervals[interval],
-                "semitons": interval,
-                "descricao": self.get_interval_description(interval),
-                "exemplo_musical": self.get_interval_example(interval)
-            }
-            
-        except Exception as e:
-            return {"erro": str(e)}
+        """Explica o intervalo entre duas notas (resultado em cache; não modificar)."""
+        idx1 = _NOTE_INDEX.get(note1.upper())
+        if idx1 is None:
+            return _unknown_note(note1)
+        idx2 = _NOTE_INDEX.get(note2.upper())
+        if idx2 is None:
+            return _unknown_note(note2)
+        
+        # Calcula o intervalo ascendente
+        interval = (idx2 - idx1) % 12
+        info = _INTERVAL_FACTS[interval]
+        
+        return {
+            "nota1": note1.upper().capitalize(),  # mantém a grafia do pedido (Bb, C#)
+            "nota2": note2.upper().capitalize(),
+            "intervalo": info.name,
+            "semitons": interval,
+            "descricao": info.description,
+            "exemplo_musical": info.example
+        }
     
     def get_interval_description(self, semitones: int) -> str:
         """Retorna descrição de um intervalo."""
-        descriptions = {
-            0: "Mesmo som, sem diferença de altura.",
-            1: "Intervalo muito dissonante, cria tensão.",
-            2: "Intervalo consonante, som suave.",
-            3: "Característico de acordes menores, som melancólico.",
-            4: "Característico de acordes maiores, som alegre.",
-            5: "Intervalo muito estável, base da harmonia.",
-            6: "Intervalo muito dissonante, divide a oitava ao meio.",
-            7: "Intervalo perfeito, muito consonante.",
-            8: "Intervalo suave, usado em melodias.",
-            9: "Intervalo brilhante, usado em acordes maiores.",
-            10: "Usado em acordes de 7ª, cria tensão moderada.",
-            11: "Intervalo muito consonante, usado em acordes sofisticados.",
-            12: "Repetição da nota fundamental uma oitava acima."
-        }
-        return descriptions.get(semitones, "Descrição não disponível.")
+        return _INTERVAL_FACTS[semitones].description if 0 <= semitones <= 12 else "Descrição não disponível."
     
     def get_interval_example(self, semitones: int) -> str:
         """Retorna exemplo musical de um intervalo."""
-        examples = {
-            0: "Duas vozes cantando a mesma nota",
-            1: "Tema do filme 'Tubarão'",
-            2: "Início de 'Frère Jacques'",
-            3: "Início de 'Greensleeves'",
-            4: "Início de 'When the Saints Go Marching In'",
-            5: "Início de 'Here Comes the Bride'",
-            6: "Abertura de 'West Side Story' (Maria)",
-            7: "Início de 'Twinkle, Twinkle, Little Star'",
-            8: "Tema de 'The Way You Look Tonight'",
-            9: "Início de 'My Bonnie Lies Over the Ocean'",
-            10: "Acorde dominante em 'Happy Birthday'",
-            11: "Início de 'Take On Me' (a-ha)",
-            12: "Início de 'Somewhere Over the Rainbow'"
-        }
-        return examples.get(semitones, "Exemplo não disponível.")
+        return _INTERVAL_FACTS[semitones].example if 0 <= semitones <= 12 else "Exemplo não disponível."
     
+    @lru_cache(maxsize=256)
     def explain_mode(self, tonic: str, mode_name: str) -> Dict:
-        """Explica um modo musical."""
-        try:
-            mode_name_lower = mode_name.lower()
-            if mode_name_lower not in self.modes:
-                return {"erro": f"Modo '{mode_name}' não reconhecido."}
-            
-            root_idx = self.note_names.index(tonic.upper())
-            intervals = self.modes[mode_name_lower]
-            notes = [self.note_names[(root_idx + i) % 12] for i in intervals]
-            
-            mode_descriptions = {
-                "jônio": "Modo maior tradicional, alegre e estável.",
-                "dórico": "Modo menor com 6ª maior, usado no jazz e folk.",
-                "frígio": "Modo menor com 2ª menor, som espanhol/flamenco.",
-                "lídio": "Modo maior com 4ª aumentada, som etéreo.",
-                "mixolídio": "Modo maior com 7ª menor, usado no rock e blues.",
-                "eólio": "Modo menor natural, melancólico.",
-                "lócrio": "Modo com 5ª diminuta, muito instável."
-            }
-            
-            mode_genres = {
-                "jônio": ["Pop", "Rock", "Clássica"],
-                "dórico": ["Jazz", "Folk", "Rock progressivo"],
-                "frígio": ["Flamenco", "Metal", "Música espanhola"],
-                "lídio": ["Jazz fusion", "Trilhas sonoras", "Música new age"],
-                "mixolídio": ["Blues", "Rock", "Country"],
-                "eólio": ["Rock", "Pop", "Folk"],
-                "lócrio": ["Jazz", "Metal extremo", "Música experimental"]
-            }
-            
-            return {
-                "modo": f"{tonic.upper()} {mode_name}",
-                "notas": notes,
-                "caracteristica": self.get_mode_characteristic(mode_name_lower),
-                "descricao": mode_descriptions.get(mode_name_lower, "Descrição não disponível."),
-                "generos_musicais": mode_genres.get(mode_name_lower, [])
-            }
-            
-        except Exception as e:
-            return {"erro": str(e)}
+        """Explica um modo musical (resultado em cache; não modificar)."""
+        mode_name_lower = mode_name.lower()
+        info = _MODE_INFO.get(mode_name_lower)
+        if info is None:
+            return {"erro": f"Modo '{mode_name}' não reconhecido."}
+        
+        tonic_upper = tonic.upper()
+        if tonic_upper not in _NOTE_INDEX:
+            return _unknown_note(tonic)
+        characteristic, description, genres = info
+        
+        return {
+            "modo": f"{tonic_upper.capitalize()} {mode_name}",
+            "notas": _MODE_NOTES[(tonic_upper, mode_name_lower)],
+            "caracteristica": characteristic,
+            "descricao": description,
+            "generos_musicais": genres
+        }
+    
+    def all_mode_notes(self, tonic: str) -> Dict[str, List[str]]:
+        """Retorna as notas de todos os modos a partir de uma tônica; ValueError se a tônica não existir."""
+        self.note_index(tonic)  # valida a tônica
+        tonic_upper = tonic.upper()
+        return {mode: list(_MODE_NOTES[(tonic_upper, mode)]) for mode in _MODES}
     
     def get_mode_characteristic(self, mode_name: str) -> str:
         """Retorna a característica principal de um modo."""
-        characteristics = {
-            "jônio": "3ª e 7ª maiores",
-            "dórico": "3ª menor, 6ª maior",
-            "frígio": "2ª menor, 3ª menor",
-            "lídio": "4ª aumentada",
-            "mixolídio": "3ª maior, 7ª menor",
-            "eólio": "3ª menor, 6ª menor, 7ª menor",
-            "lócrio": "2ª menor, 5ª diminuta"
-        }
-        return characteristics.get(mode_name, "Característica não definida.")
+        return _MODE_CHARACTERISTICS.get(mode_name, "Característica não definida.")
     
+    @lru_cache(maxsize=256)
     def explain_cadence(self, cadence_type: str) -> Dict:
-        """Explica uma cadência harmônica."""
-        cadence_type_lower = cadence_type.lower()
-        
-        # Busca por palavras-chave
-        if "autêntica" in cadence_type_lower or "autentica" in cadence_type_lower:
-            cadence_key = "autêntica perfeita"
-        elif "plagal" in cadence_type_lower:
-            cadence_key = "plagal"
-        elif "deceptiva" in cadence_type_lower:
-            cadence_key = "deceptiva"
-        else:
+        """Explica uma cadência harmônica (resposta pré-montada e compartilhada; não modificar)."""
+        # Busca por palavras-chave numa única varredura do texto
+        match = _CADENCE_RE.search(cadence_type.lower().translate(_STRIP_ACCENTS))
+        if not match:
             return {"erro": f"Cadência '{cadence_type}' não reconhecida."}
-        
-        if cadence_key in self.cadences:
-            cadence_info = self.cadences[cadence_key]
-            return {
-                "cadencia": cadence_key,
-                "progressao": cadence_info["progressao"],
-                "descricao": cadence_info["descricao"],
-                "funcao": cadence_info["funcao"]
-            }
-        
-        return {"erro": f"Cadência '{cadence_type}' não encontrada."}
+        response = _CADENCE_RESPONSES.get(_CADENCE_KEYS[match.group(1)])
+        if response is None:
+            return {"erro": f"Cadência '{cadence_type}' não encontrada."}
+        return response
     
+    @lru_cache(maxsize=256)
     def explain_harmonic_function(self, degree: str, mode: str) -> Dict:
-        """Explica a função harmônica de um grau."""
-        try:
-            degree_num = self.roman_to_number(degree)
-            
-            if "maior" in mode.lower():
-                functions = {
-                    1: {"nome": "Tônica", "descricao": "Centro tonal, repouso", "exemplos": ["C em C maior"]},
-                    2: {"nome": "Supertônica", "descricao": "Preparação subdominante", "exemplos": ["Dm em C maior"]},
-                    3: {"nome": "Mediante", "descricao": "Tônica relativa", "exemplos": ["Em em C maior"]},
-                    4: {"nome": "Subdominante", "descricao": "Afastamento da tônica", "exemplos": ["F em C maior"]},
-                    5: {"nome": "Dominante", "descricao": "Tensão máxima", "exemplos": ["G em C maior"]},
-                    6: {"nome": "Superdominante", "descricao": "Tônica relativa", "exemplos": ["Am em C maior"]},
-                    7: {"nome": "Sensível", "descricao": "Tensão dominante", "exemplos": ["Bdim em C maior"]}
-                }
-            else:
-                functions = {
-                    1: {"nome": "Tônica", "descricao": "Centro tonal, repouso", "exemplos": ["Am em A menor"]},
-                    2: {"nome": "Supertônica", "descricao": "Preparação subdominante", "exemplos": ["Bdim em A menor"]},
-                    3: {"nome": "Mediante", "descricao": "Dominante relativa", "exemplos": ["C em A menor"]},
-                    4: {"nome": "Subdominante", "descricao": "Afastamento da tônica", "exemplos": ["Dm em A menor"]},
-                    5: {"nome": "Dominante", "descricao": "Tensão máxima", "exemplos": ["Em em A menor"]},
-                    6: {"nome": "Superdominante", "descricao": "Subdominante relativa", "exemplos": ["F em A menor"]},
-                    7: {"nome": "Subtônica", "descricao": "Dominante relativa", "exemplos": ["G em A menor"]}
-                }
-            
-            if degree_num in functions:
-                func_info = functions[degree_num]
-                return {
-                    "grau": degree,
-                    "modo": mode,
-                    "nome": func_info["nome"],
-                    "descricao": func_info["descricao"],
-                    "exemplos": func_info["exemplos"]
-                }
-            else:
-                return {"erro": f"Grau '{degree}' não reconhecido."}
-                
-        except Exception as e:
-            return {"erro": str(e)}
+        """Explica a função harmônica de um grau (resultado em cache; não modificar)."""
+        # Grau desconhecido vira erro (roman_to_number assumiria a tônica)
+        degree_num = _ROMAN_MAP.get(degree.strip())
+        functions = _MAJOR_FUNCTIONS if "maior" in mode.lower() else _MINOR_FUNCTIONS
+        func_info = functions.get(degree_num)
+        if func_info is None:
+            return {"erro": f"Grau '{degree}' não reconhecido."}
+        
+        return {
+            "grau": degree,
+            "modo": mode,
+            "nome": func_info["nome"],
+            "descricao": func_info["descricao"],
+            "exemplos": func_info["exemplos"]
+        }
     
     def roman_to_number(self, roman: str) -> int:
         """Converte numeral romano para número."""
-        roman_map = {
-            'I': 1, 'II': 2, 'III': 3, 'IV': 4, 'V': 5, 'VI': 6, 'VII': 7,
-            'i': 1, 'ii': 2, 'iii': 3, 'iv': 4, 'v': 5, 'vi': 6, 'vii': 7
-        }
-        return roman_map.get(roman.strip(), 1)
+        return _ROMAN_MAP.get(roman.strip(), 1)
     
+    @lru_cache(maxsize=256)
     def explain_harmonic_field(self, tonic: str, mode: str = "major") -> Dict:
-        """Explica o campo harmônico de uma tonalidade."""
-        try:
-            if mode.lower() in ["major", "maior"]:
-                key = m21.key.Key(tonic, 'major')
-                chord_qualities = ["", "m", "m", "", "", "m", "dim"]
-                description = "Campo harmônico maior: base para a maioria das progressões na música ocidental."
-            elif mode.lower() in ["minor", "menor"]:
-                key = m21.key.Key(tonic, 'minor')
-                chord_qualities = ["m", "dim", "", "m", "m", "", ""]
-                description = "Campo harmônico menor: oferece sonoridades mais melancólicas e dramáticas."
-            else:
-                return {"erro": "Modo não reconhecido. Use 'maior' ou 'menor'."}
-            
-            chords = []
-            roman_numerals = ["I", "II", "III", "IV", "V", "VI", "VII"]
-            
-            for degree in range(1, 8):
-                chord = key.getChord(degree)
-                chord_name = chord.commonName
-                chords.append({
-                    "grau": roman_numerals[degree-1],
-                    "acorde": chord_name,
-                    "cifra": f"{chord.root().name}{chord_qualities[degree-1]}",
-                    "funcao": self.get_chord_function(degree, mode)
-                })
-            
-            return {
-                "tonalidade": f"{tonic} {mode}",
-                "acordes": chords,
-                "descricao": description,
-                "progressoes_comuns": self.get_common_progressions(mode)
-            }
-            
-        except Exception as e:
-            return {"erro": str(e)}
+        """Explica o campo harmônico de uma tonalidade (resultado em cache; não modificar)."""
+        tonic_upper = tonic.upper()
+        if tonic_upper not in _NOTE_INDEX:
+            return _unknown_note(tonic)
+        field = _MODE_NORM.get(mode.lower())
+        if field is None:
+            return {"erro": "Modo não reconhecido. Use 'maior' ou 'menor'."}
+        
+        # Tríade de cada grau a partir das fundamentais pré-calculadas (sem objetos music21)
+        chords = [
+            {"grau": roman, "acorde": triad, "cifra": f"{root}{quality}", "funcao": function}
+            for root, (roman, quality, triad, function) in zip(_FIELD_ROOTS[(tonic_upper, field)], _FIELD_DEGREES[field])
+        ]
+        
+        return {
+            "tonalidade": f"{tonic} {mode}",
+            "acordes": chords,
+            "descricao": _FIELD_DESCRIPTIONS[field],
+            "progressoes_comuns": self.get_common_progressions(field)
+        }
+    
+    def get_common_progressions(self, mode: str) -> List[str]:
+        """Retorna progressões comuns para o modo (maior ou menor)."""
+        return _COMMON_PROGRESSIONS[_MODE_NORM.get(mode.lower(), "minor")]
+    
+    def suggest_chord_progression(self, root: str, chord_type: str) -> str:
+        """Sugere a progressão I - IV - V - I do campo em que o acorde é a tônica."""
+        field = "minor" if _CHORD_ALIASES[chord_type.lower()][0] == "minor" else "major"
+        roots = _FIELD_ROOTS[(root.upper(), field)]
+        qualities = _FIELD_QUALITIES[field]
+        return " - ".join(f"{roots[degree]}{qualities[degree]}" for degree in (0, 3, 4, 0))
     
     def get_chord_function(self, degree: int, mode: str) -> str:
         """Retorna a função harmônica de um grau."""
-        if mode.lower() in ["major", "maior"]:
-            functions = {
-                1: "Tônica (repouso)",
-                2: "Subdominante (preparação)",
-                3: "Tônica relativa",
-                4: "Subdominante (afastamento)",
-                5: "Dominante (tensão)",
-                6: "Superdominante (tônica relativa)",
-                7: "Meio diminuto (Tensão)"
-            }
-
+        functions = _MAJOR_CHORD_FUNCTIONS if _MODE_NORM.get(mode.lower()) == "major" else _MINOR_CHORD_FUNCTIONS
+        return functions.get(degree, "")
+    
 class generate_exercise:
+    __slots__ = ("music_theory",)
+
     def __init__(self, music_theory: MusicTheoryTeacher):
         self.music_theory = music_theory
 
@@ -368,10 +544,10 @@ class generate_exercise:
             return {"erro": harmonic_field["erro"]}
 
         chords = harmonic_field["acordes"]
-        progression = random.sample(chords, 4)  # Seleciona 4 acordes aleatórios
+        indices = _RNG.sample(range(len(chords)), 4)  # Seleciona 4 graus aleatórios
 
         return {
             "tonalidade": harmonic_field["tonalidade"],
-            "progressoes": [chord["cifra"] for chord in progression]
+            "progressoes": [chords[i]["cifra"] for i in indices]
         }
     
\ No newline at end of file